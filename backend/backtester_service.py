@@ -1,9 +1,11 @@
 import json
+import numpy as np
 import pandas as pd
-import yfinance as yf
 import tempfile
 import os
 import logging
+from .bar_store import get_bars
+from .metrics import timed
 
 # Try importing rust_core, handle failure gracefully
 try:
@@ -12,83 +14,95 @@ except ImportError:
     rc = None
     logging.error("Could not import rust_core. Backtester will not work.")
 
-def run_backtest(symbol: str, strategy_type: str, params: dict, initial_capital: float):
-    if not rc:
-        raise ImportError("rust_core module not found. Please ensure the backtester extension is built and installed.")
+def load_price_arrays(symbol: str, period: str = "5y"):
+    """
+    Price series in the layout rust_core consumes: contiguous int64 epoch-ms
+    timestamps and float64 price/volume arrays.
+    """
+    df = get_bars(symbol, period=period)
 
-    # Fetch data
-    ticker = yf.Ticker(symbol)
-    # Fetch enough data for the slow period + simulation
-    df = ticker.history(period="5y") 
-    
     if df.empty:
         raise ValueError(f"No data found for {symbol}")
-        
-    # Prepare CSV for rust_core
+
+    # Bar times are exchange-local wall time; rust_core treats them as UTC (as the CSV path always did)
+    ts_ms = np.ascontiguousarray(df.index.values.astype('datetime64[ms]').astype(np.int64))
+    price = np.ascontiguousarray(df['Close'].to_numpy(dtype=np.float64))
+    volume = np.ascontiguousarray(df['Volume'].to_numpy(dtype=np.float64))
+    return ts_ms, price, volume
+
+def _run_arrays(ts_ms, price, volume, cfg):
+    # Buffers are read in place by rust_core; results come back as (ts_ms, equity, sharpe) arrays
+    out_ts, equity, sharpe = rc.backtest_arrays(ts_ms, price, volume, cfg)
+    return np.asarray(out_ts, dtype=np.int64), np.asarray(equity, dtype=np.float64), np.asarray(sharpe, dtype=np.float64)
+
+def _run_csv(ts_ms, price, volume, cfg):
+    # Fallback for rust_core builds without the array entry point
     # Expected headers: ts, price, volume
-    df.reset_index(inplace=True)
-    
-    # Identify Date column
-    # yfinance usually returns 'Date' (date only) or 'Datetime' (timestamp)
-    # We normalize column names to be safe
-    df.columns = [c.capitalize() for c in df.columns]
-    
-    date_col = 'Date' if 'Date' in df.columns else 'Datetime'
-    if date_col not in df.columns:
-         # Fallback check
-         for c in df.columns:
-             if 'date' in c.lower():
-                 date_col = c
-                 break
-    
-    # Create the dataframe expected by rust_core
-    df_ready = pd.DataFrame()
-    df_ready['ts'] = df[date_col]
-    df_ready['price'] = df['Close']
-    df_ready['volume'] = df['Volume']
-    
-    # Ensure datetime and format as ISO 8601
-    # rust_core expects DateTime<Utc>
-    df_ready['ts'] = pd.to_datetime(df_ready['ts']).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-    
+    # rust_core expects DateTime<Utc> formatted as ISO 8601
+    df_ready = pd.DataFrame({
+        'ts': pd.to_datetime(ts_ms, unit='ms').strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'price': price,
+        'volume': volume
+    })
+
     # Save to temp file
     with tempfile.NamedTemporaryFile(mode='w', suffix=".csv", delete=False, newline='') as tmp:
         df_ready.to_csv(tmp.name, index=False)
         tmp_path = tmp.name
-        
+
     try:
-        # Config
-        cfg = json.dumps({
-            "strategy": strategy_type,
-            "params": params,
-            "initial_capital": float(initial_capital)
-        })
-        
-        # Run backtest
-        # rc.backtest returns a list of tuples/lists
-        rows = rc.backtest(tmp_path, cfg)
-        
-        # Parse results
-        # Assuming rows structure from README: [ts_ms, equity, sharpe]
-        results = []
-        for r in rows:
-            results.append({
-                "time": r[0] / 1000, # Convert ms to seconds for lightweight-charts
-                "value": r[1],       # Equity
-                "sharpe": r[2]
-            })
-            
+        # rc.backtest returns a list of rows: [ts_ms, equity, sharpe]
+        rows = np.asarray(rc.backtest(tmp_path, cfg), dtype=np.float64).reshape(-1, 3)
+        return rows[:, 0].astype(np.int64), rows[:, 1], rows[:, 2]
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def run_backtest_arrays(ts_ms, price, volume, strategy_type: str, params: dict, initial_capital: float):
+    """Run one backtest on prepared arrays. Returns (ts_ms, equity, sharpe) arrays."""
+    if not rc:
+        raise ImportError("rust_core module not found. Please ensure the backtester extension is built and installed.")
+
+    # Config
+    cfg = json.dumps({
+        "strategy": strategy_type,
+        "params": params,
+        "initial_capital": float(initial_capital)
+    })
+
+    with timed("rust_core", "backtest"):
+        if hasattr(rc, "backtest_arrays"):
+            return _run_arrays(ts_ms, price, volume, cfg)
+        return _run_csv(ts_ms, price, volume, cfg)
+
+def run_backtest(symbol: str, strategy_type: str, params: dict, initial_capital: float, columnar: bool = False):
+    if not rc:
+        raise ImportError("rust_core module not found. Please ensure the backtester extension is built and installed.")
+
+    # Fetch enough data for the slow period + simulation
+    ts_ms, price, volume = load_price_arrays(symbol)
+
+    try:
+        out_ts, equity, sharpe = run_backtest_arrays(ts_ms, price, volume, strategy_type, params, initial_capital)
+
+        # Convert ms to seconds for lightweight-charts
+        times = (out_ts / 1000).tolist()
+        if columnar:
+            results = {"time": times, "value": equity.tolist(), "sharpe": sharpe.tolist()}
+        else:
+            results = [
+                {"time": t, "value": v, "sharpe": s}
+                for t, v, s in zip(times, equity.tolist(), sharpe.tolist())
+            ]
+
         return {
             "symbol": symbol,
             "equity_curve": results,
-            "final_equity": results[-1]['value'] if results else initial_capital,
-            "total_return": ((results[-1]['value'] - initial_capital) / initial_capital) * 100 if results else 0,
-            "sharpe_ratio": results[-1]['sharpe'] if results else 0
+            "final_equity": float(equity[-1]) if len(equity) else initial_capital,
+            "total_return": float((equity[-1] - initial_capital) / initial_capital * 100) if len(equity) else 0,
+            "sharpe_ratio": float(sharpe[-1]) if len(sharpe) else 0
         }
-        
+
     except Exception as e:
         logging.error(f"Backtest failed: {e}")
         raise e
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
@@ -0,0 +1,181 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from .metrics import timed
+
+# On-disk OHLCV store shared by every service that needs price history.
+# One Parquet file per (interval, symbol): ./bar_store/1d/SPY.parquet
+BAR_STORE_DIR = os.environ.get("BAR_STORE_DIR", "./bar_store")
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# yfinance period strings -> calendar days of history
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+# How long a stored series is trusted before its tail is re-checked upstream
+REFRESH_SECONDS = {"1d": 300, "1wk": 3600, "1mo": 3600}
+DEFAULT_REFRESH_SECONDS = 60
+
+# Relative tolerance when comparing the overlap bar of a tail fetch
+ADJUSTMENT_TOLERANCE = 1e-6
+
+_frames = {}        # (symbol, interval) -> DataFrame sorted by index
+_covered_from = {}  # (symbol, interval) -> earliest date already requested upstream
+_checked_at = {}    # (symbol, interval) -> monotonic time of last tail check
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _key_lock(key):
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def _path(symbol, interval):
+    return os.path.join(BAR_STORE_DIR, interval, f"{symbol.upper()}.parquet")
+
+
+def _fetch(symbol, interval, start=None, end=None):
+    """Download bars from yfinance and normalise them to the store layout."""
+    with timed("yfinance", "history"):
+        df = yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+    if df.empty:
+        return df
+    df = df[COLUMNS]
+    # Store exchange-local wall time without tz so slices compare against plain dates
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def _merge(stored, fresh):
+    if stored is None or stored.empty:
+        return fresh
+    if fresh.empty:
+        return stored
+    merged = pd.concat([stored, fresh])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def _save(symbol, interval, df):
+    path = _path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _load(symbol, interval):
+    key = (symbol, interval)
+    if key not in _frames:
+        path = _path(symbol, interval)
+        if os.path.exists(path):
+            df = pd.read_parquet(path)
+            _frames[key] = df
+            _covered_from[key] = df.index[0] if not df.empty else None
+        else:
+            _frames[key] = None
+    return _frames[key]
+
+
+def _refresh_tail(symbol, interval, df):
+    """
+    Fetch bars after the last stored one. The fetch overlaps the last complete
+    stored bar: if upstream now reports a different price for it, history was
+    re-adjusted (split/dividend) and the whole stored range is downloaded again.
+    """
+    overlap = df.index[-2] if len(df) > 1 else df.index[-1]
+    fresh = _fetch(symbol, interval, start=overlap.strftime("%Y-%m-%d"))
+    if fresh.empty:
+        return df
+
+    if overlap in fresh.index:
+        old_close = df.at[overlap, "Close"]
+        new_close = fresh.at[overlap, "Close"]
+        if not np.isclose(old_close, new_close, rtol=ADJUSTMENT_TOLERANCE):
+            logging.info(f"Bar store: {symbol} {interval} re-adjusted upstream, reloading history")
+            full = _fetch(symbol, interval, start=df.index[0].strftime("%Y-%m-%d"))
+            return full if not full.empty else df
+
+    return _merge(df, fresh)
+
+
+def _ensure(symbol, interval, start):
+    """Make sure the store covers [start, now] for this key, fetching only what is missing."""
+    key = (symbol, interval)
+    with _key_lock(key):
+        df = _load(symbol, interval)
+        changed = False
+
+        if df is None or df.empty:
+            df = _fetch(symbol, interval, start=start.strftime("%Y-%m-%d"))
+            _covered_from[key] = start
+            changed = not df.empty
+        else:
+            refresh_after = REFRESH_SECONDS.get(interval, DEFAULT_REFRESH_SECONDS)
+            last_check = _checked_at.get(key)
+            if last_check is None or time.monotonic() - last_check > refresh_after:
+                updated = _refresh_tail(symbol, interval, df)
+                changed = updated is not df
+                df = updated
+
+            covered = _covered_from.get(key)
+            if covered is None or start < covered:
+                # Head is missing: fetch only up to the first stored bar
+                head = _fetch(symbol, interval,
+                              start=start.strftime("%Y-%m-%d"),
+                              end=df.index[0].strftime("%Y-%m-%d"))
+                _covered_from[key] = start
+                if not head.empty:
+                    df = _merge(df, head)
+                    changed = True
+
+        _checked_at[key] = time.monotonic()
+        if changed:
+            _save(symbol, interval, df)
+        _frames[key] = df
+        return df
+
+
+def get_bars(symbol: str, period: str = "1y", interval: str = "1d", start=None, end=None):
+    """
+    Return OHLCV bars for `symbol` in the same shape as `yf.Ticker.history`
+    (DatetimeIndex, Open/High/Low/Close/Volume), served from the local store.
+
+    Either `period` or an explicit `start` (and optional exclusive `end`, as in
+    yfinance) selects the range. The result is a positional slice of the
+    stored frame, not a copy; callers must not mutate it in place.
+    """
+    symbol = symbol.upper()
+    if start is not None:
+        start_dt = pd.to_datetime(start)
+    else:
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Unsupported period: {period}")
+        today = pd.Timestamp(datetime.now().date())
+        start_dt = today - timedelta(days=PERIOD_DAYS[period])
+
+    df = _ensure(symbol, interval, start_dt)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    lo = df.index.searchsorted(start_dt, side="left")
+    hi = df.index.searchsorted(pd.to_datetime(end), side="left") if end is not None else len(df)
+    return df.iloc[lo:hi]
+
+
+def get_close_panel(symbols, period: str = "1y", interval: str = "1d", start=None, end=None):
+    """Close prices for several symbols aligned on date, like `yf.download(symbols)['Close']`."""
+    closes = {s: get_bars(s, period=period, interval=interval, start=start, end=end)["Close"] for s in symbols}
+    return pd.DataFrame(closes)
@@ -0,0 +1,105 @@
+"""
+Regenerate the checked-in benchmark fixtures (deterministic, no network).
+
+    python -m backend.benchmarks.make_fixtures
+
+Only needed when the fixture shapes change; the benchmark baseline should be
+re-recorded afterwards (python -m backend.benchmarks.suite --update-baseline).
+"""
+import os
+import sys
+import random
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+SECTORS = ["XLE", "XLF", "XLK", "XLV", "XLI", "XLY", "XLP", "XLU", "XLB", "XLRE", "XLC"]
+
+def _gbm(rng, n, start, mu=0.0003, sigma=0.012):
+    return start * np.exp(np.cumsum(rng.normal(mu, sigma, n)))
+
+def sector_closes(rng, n_days=780):
+    # Correlated daily closes: one market factor plus sector noise
+    dates = pd.bdate_range("2022-01-03", periods=n_days)
+    market = rng.normal(0.0003, 0.009, n_days)
+    closes = {s: 50 * np.exp(np.cumsum(market + rng.normal(0, 0.007, n_days))) for s in SECTORS}
+    return pd.DataFrame(closes, index=pd.Index(dates, name="Date")).round(4)
+
+def daily_bars(rng, n_days=1260):
+    dates = pd.bdate_range("2020-01-02", periods=n_days)
+    close = _gbm(rng, n_days, 320.0)
+    open_ = close * (1 + rng.normal(0, 0.003, n_days))
+    spread = np.abs(rng.normal(0, 0.006, n_days)) * close
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(40_000_000, 120_000_000, n_days).astype(float),
+    }, index=pd.Index(dates, name="Date")).round(4)
+
+def option_chain(rng, spot=450.0, n_expirations=12):
+    # Every expiration shares one strike ladder; IV has a skew and term structure
+    strikes = np.arange(round(spot * 0.5), round(spot * 1.5), 2.5)
+    rows = []
+    for T in np.geomspace(2 / 365, 2.0, n_expirations):
+        m = np.log(strikes / spot)
+        iv = 0.18 + 0.25 * m ** 2 - 0.08 * m + 0.01 / np.sqrt(T) + rng.normal(0, 0.003, len(strikes))
+        for is_call in (True, False):
+            rows.append(pd.DataFrame({"strike": strikes, "T": T, "iv": np.maximum(iv, 0.01), "is_call": is_call}))
+    return pd.concat(rows, ignore_index=True).round(6)
+
+HEADLINE_WORDS = ["shares", "stock", "market", "earnings", "quarter", "analysts", "guidance", "revenue",
+                  "investors", "the", "a", "on", "after", "as", "its", "for", "to", "in", "of", "with", "says",
+                  "ceo", "fed", "rates", "tech", "chip", "demand", "sales", "outlook", "up", "down", "growth",
+                  "loss", "record", "high", "low", "beat", "miss", "strong", "weak", "not", "surge", "plunge",
+                  "crash", "rally", "sell", "off", "profit", "warning", "expectations", "downgrade", "upgrade"]
+COMPANIES = ["Apple", "Nvidia", "Tesla", "AMD", "Microsoft", "Amazon", "Meta", "Alphabet", "Intel", "Netflix"]
+
+def headlines(rng, n=2000):
+    out = []
+    for _ in range(n):
+        words = [rng.choice(HEADLINE_WORDS) for _ in range(rng.randint(5, 13))]
+        out.append(f"{rng.choice(COMPANIES)} {' '.join(words)}{rng.choice(['', '.', '!', ' - Reuters', ': report'])}")
+    return out
+
+def transactions(rng, n=5000, n_symbols=40):
+    # Buys and partial sells per symbol, so replay exercises multi-lot FIFO matching
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    held = {s: 0 for s in symbols}
+    start = pd.Timestamp("2024-01-02 09:30")
+    rows = []
+    for i in range(n):
+        sym = rng.choice(symbols)
+        price = round(rng.uniform(20, 300), 2)
+        if held[sym] > 0 and rng.random() < 0.45:
+            qty = rng.randint(1, held[sym])
+            action = "sell"
+            held[sym] -= qty
+        else:
+            qty = rng.randint(1, 50)
+            action = "buy"
+            held[sym] += qty
+        rows.append({"symbol": sym, "action": action, "quantity": qty, "price": price,
+                     "timestamp": start + pd.Timedelta(minutes=7 * i)})
+    return pd.DataFrame(rows)
+
+def main():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    rng = np.random.default_rng(7)
+    py_rng = random.Random(7)
+
+    sector_closes(rng).to_csv(os.path.join(FIXTURE_DIR, "sector_closes.csv"))
+    daily_bars(rng).to_csv(os.path.join(FIXTURE_DIR, "daily_bars.csv"))
+    option_chain(rng).to_csv(os.path.join(FIXTURE_DIR, "option_chain.csv"), index=False)
+    with open(os.path.join(FIXTURE_DIR, "headlines.txt"), "w") as f:
+        f.write("\n".join(headlines(py_rng)) + "\n")
+    transactions(py_rng).to_csv(os.path.join(FIXTURE_DIR, "transactions.csv"), index=False)
+
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        print(f"{name:<20} {os.path.getsize(os.path.join(FIXTURE_DIR, name)) / 1024:8.1f} KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+Offline benchmark suite for the numeric hot paths, with regression gates.
+
+Run from the repository root (checked-in fixtures, throwaway stores, no network):
+    python -m backend.benchmarks.suite                    # compare against baseline.json
+    python -m backend.benchmarks.suite --only gbm_paths greeks_chain_array
+    python -m backend.benchmarks.suite --update-baseline  # re-record on the reference machine
+
+Each benchmark reports min/median wall time over --repeats runs and the peak
+traced allocation (tracemalloc) of one extra run. Every timed run is paired
+with a run of a fixed calibration workload, and the gate compares the median
+of time / calibration time, so a machine that is slower or busier across the
+board doesn't read as a regression. The exit status is 1 when that relative
+time exceeds the baseline by more than the tolerance (widened to the measured
+run-to-run spread), or when peak memory, which doesn't jitter, exceeds its
+baseline at all beyond the memory tolerance.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# Peak-memory differences below this are noise, whatever the relative change
+MEMORY_SLACK_KB = 64
+
+# The time tolerance is widened to this many times the relative spread (IQR / median) of the runs
+SPREAD_FACTOR = 3
+
+BENCHMARKS = {}  # name -> setup() returning fn or (fn, before_each)
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def _fixture(name):
+    return os.path.join(FIXTURE_DIR, name)
+
+def _read_frame(name):
+    import pandas as pd
+    return pd.read_csv(_fixture(name), parse_dates=["Date"], index_col="Date")
+
+
+# --- Options -----------------------------------------------------------------
+
+def _chain():
+    import pandas as pd
+    return pd.read_csv(_fixture("option_chain.csv"))
+
+@benchmark("greeks_chain_scalar")
+def _greeks_chain_scalar():
+    # One expiration's full chain through the per-contract function
+    from backend.greeks import calculate_greeks
+    chain = _chain()
+    chain = chain[chain["T"] == chain["T"].unique()[len(chain["T"].unique()) // 2]]
+    rows = list(chain.itertuples(index=False))
+    S, r = 450.0, 0.045
+
+    def run():
+        return [calculate_greeks(S, c.strike, c.T, r, c.iv, "call" if c.is_call else "put") for c in rows]
+    return run
+
+@benchmark("greeks_chain_array")
+def _greeks_chain_array():
+    # Every expiration at once, as the options route does
+    from backend.greeks import calculate_greeks_array
+    chain = _chain()
+    K, T, iv, is_call = (chain[c].to_numpy() for c in ("strike", "T", "iv", "is_call"))
+
+    def run():
+        return calculate_greeks_array(450.0, K, T, 0.045, iv, is_call)
+    return run
+
+
+# --- Entropy -----------------------------------------------------------------
+
+@benchmark("entropy_rolling")
+def _entropy_rolling():
+    from backend.entropy_service import rolling_entropy
+    returns = _read_frame("sector_closes.csv").pct_change().dropna()
+
+    def run():
+        return rolling_entropy(returns, window=20)
+    return run
+
+@benchmark("entropy_cold")
+def _entropy_cold():
+    # compute_market_entropy with an empty store: full series plus classifier fit
+    from backend import entropy_service
+    closes = _read_frame("sector_closes.csv")
+
+    def close_panel(symbols, period="1y", interval="1d", start=None, end=None):
+        panel = closes[list(symbols)]
+        if start:
+            panel = panel[panel.index >= start]
+        if end:
+            panel = panel[panel.index < end]
+        return panel
+    entropy_service.get_close_panel = close_panel
+    start_date = str((closes.index[0] + (closes.index[-1] - closes.index[0]) * 0.15).date())
+    end_date = str(closes.index[-1].date())
+
+    def reset():
+        entropy_service.ENTROPY_STORE_DIR = tempfile.mkdtemp(dir=_scratch)
+        entropy_service._series.clear()
+        entropy_service._classifiers.clear()
+        entropy_service._covered_from.clear()
+
+    def run():
+        return entropy_service.compute_market_entropy(window=20, start_date=start_date, end_date=end_date)
+    return run, reset
+
+
+# --- GBM ---------------------------------------------------------------------
+
+@benchmark("gbm_paths")
+def _gbm_paths():
+    from backend.gbm_service import simulate_paths, quantile_bands, terminal_histogram
+
+    def run():
+        paths = simulate_paths(450.0, 0.0004, 0.012, 252, 10000, seed=1)
+        return quantile_bands(paths), terminal_histogram(paths)
+    return run
+
+
+# --- Portfolio / ledger ------------------------------------------------------
+
+def _seed_portfolio():
+    import pandas as pd
+    from backend.database import init_db, SessionLocal, Portfolio, Transaction, Holding, Lot, TickerMetadata
+    from backend.ledger import backfill_ledger
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Transaction).count() == 0:
+            txns = pd.read_csv(_fixture("transactions.csv"), parse_dates=["timestamp"])
+            db.bulk_insert_mappings(Transaction, txns.to_dict(orient="records"))
+            db.commit()
+            backfill_ledger()
+
+            # Holdings mirror the open lots left by the replay
+            portfolio = db.query(Portfolio).first()
+            positions = {}
+            for lot in db.query(Lot).filter(Lot.portfolio_id == portfolio.id):
+                qty, cost = positions.get(lot.position_key, (0, 0.0))
+                positions[lot.position_key] = (qty + lot.quantity, cost + lot.quantity * lot.price)
+            for i, (symbol, (qty, cost)) in enumerate(sorted(positions.items())):
+                db.add(Holding(portfolio_id=portfolio.id, symbol=symbol, quantity=qty, avg_price=cost / qty))
+                db.add(TickerMetadata(symbol=symbol, sector=f"Sector{i % 6}", info_json="{}"))
+            db.commit()
+        return db.query(Portfolio).first().id, sorted({h.symbol for h in db.query(Holding)})
+    finally:
+        db.close()
+
+@benchmark("fifo_replay")
+def _fifo_replay():
+    # Rebuild lots and realized P&L stats from the full transaction history
+    from backend.database import SessionLocal, Lot, TradeStats
+    from backend.ledger import backfill_ledger
+    portfolio_id, _ = _seed_portfolio()
+
+    def reset():
+        db = SessionLocal()
+        db.query(Lot).filter(Lot.portfolio_id == portfolio_id).delete()
+        db.query(TradeStats).filter(TradeStats.portfolio_id == portfolio_id).delete()
+        db.commit()
+        db.close()
+
+    return backfill_ledger, reset
+
+@benchmark("get_portfolio")
+def _get_portfolio():
+    from backend.database import SessionLocal
+    from backend.quote_service import set_provider, StaticQuoteProvider
+    from backend.main import get_portfolio
+    _, symbols = _seed_portfolio()
+    set_provider(StaticQuoteProvider({s: 100.0 + i for i, s in enumerate(symbols)}))
+
+    def run():
+        db = SessionLocal()
+        try:
+            return get_portfolio(db)
+        finally:
+            db.close()
+    return run
+
+
+# --- Sentiment ---------------------------------------------------------------
+
+def _headlines():
+    with open(_fixture("headlines.txt")) as f:
+        return f.read().splitlines()
+
+@benchmark("sentiment_batch")
+def _sentiment_batch():
+    from backend.sentiment_service import analyze_sentiment_batch
+    headlines = _headlines()
+
+    def run():
+        return analyze_sentiment_batch(headlines)
+    return run
+
+@benchmark("sentiment_single")
+def _sentiment_single():
+    from backend.sentiment_service import analyze_sentiment
+    headlines = _headlines()[:500]
+
+    def run():
+        return [analyze_sentiment(h) for h in headlines]
+    return run
+
+
+# --- Backtester --------------------------------------------------------------
+
+@benchmark("backtest_prep")
+def _backtest_prep():
+    # Bars -> contiguous arrays handed to rust_core (the engine itself isn't needed)
+    from backend import backtester_service
+    bars = _read_frame("daily_bars.csv")
+    backtester_service.get_bars = lambda symbol, period="5y", **kwargs: bars
+
+    def run():
+        return backtester_service.load_price_arrays("SPY")
+    return run
+
+
+# --- Harness -----------------------------------------------------------------
+
+_scratch = None
+
+def _prepare_environment():
+    """Point every store at a throwaway directory before backend modules are imported."""
+    global _scratch
+    _scratch = tempfile.mkdtemp(prefix="terminal-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'bench.db')}"
+    os.environ["ENTROPY_STORE_DIR"] = os.path.join(_scratch, "entropy_store")
+    os.environ["BAR_STORE_DIR"] = os.path.join(_scratch, "bar_store")
+    os.environ.pop("SENTIMENT_MODEL_PATH", None)
+
+def _calibration():
+    # Fixed interpreter + numpy workload (~10ms) that slows down with the machine, not the code
+    import numpy as np
+    total = 0
+    for i in range(20000):
+        total += i * i % 7
+    np.sort(np.random.default_rng(0).random(100000))
+    return total
+
+def _spread(values):
+    q1, _, q3 = statistics.quantiles(values, n=4)
+    return (q3 - q1) / statistics.median(values)
+
+def measure(fn, before=None, repeats=15, warmup=1):
+    def prepare():
+        if before:
+            before()
+        gc.collect()
+
+    for _ in range(warmup):
+        prepare()
+        _calibration()
+        fn()
+
+    times = []
+    ratios = []
+    for _ in range(repeats):
+        prepare()
+        start = time.perf_counter()
+        _calibration()
+        calibration = time.perf_counter() - start
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        ratios.append(times[-1] / calibration)
+
+    prepare()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "min_ms": round(min(times) * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "relative": round(statistics.median(ratios), 4),
+        "spread": round(_spread(ratios), 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def compare(name, result, baseline, time_tolerance, memory_tolerance):
+    """Regression messages for `result` against its baseline entry."""
+    problems = []
+    tolerance = max(time_tolerance, SPREAD_FACTOR * max(result["spread"], baseline["spread"]))
+    limit = baseline["relative"] * (1 + tolerance)
+    if result["relative"] > limit:
+        problems.append(f"{name}: relative time {result['relative']:.3f} > {limit:.3f} "
+                        f"(baseline {baseline['relative']:.3f} +{tolerance:.0%}; "
+                        f"median {result['median_ms']:.2f}ms vs {baseline['median_ms']:.2f}ms)")
+    limit_kb = baseline["peak_kb"] * (1 + memory_tolerance) + MEMORY_SLACK_KB
+    if result["peak_kb"] > limit_kb:
+        problems.append(f"{name}: peak memory {result['peak_kb']:.0f}KB > {limit_kb:.0f}KB "
+                        f"(baseline {baseline['peak_kb']:.0f}KB +{memory_tolerance:.0%})")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run just these benchmarks")
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Record these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.30,
+                        help="Allowed relative-time increase (fraction), widened to the measured spread")
+    parser.add_argument("--memory-tolerance", type=float, default=0.20, help="Allowed peak-memory increase (fraction)")
+    parser.add_argument("--output", help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    _prepare_environment()
+    try:
+        names = args.only or list(BENCHMARKS)
+        results = {}
+        print(f"{'benchmark':<22} {'min ms':>10} {'median ms':>10} {'relative':>10} {'spread':>8} {'peak KB':>10}")
+        for name in names:
+            setup = BENCHMARKS[name]()
+            fn, before = setup if isinstance(setup, tuple) else (setup, None)
+            results[name] = measure(fn, before, repeats=args.repeats)
+            r = results[name]
+            print(f"{name:<22} {r['min_ms']:>10.2f} {r['median_ms']:>10.2f} {r['relative']:>10.3f} "
+                  f"{r['spread']:>8.1%} {r['peak_kb']:>10.0f}")
+    finally:
+        shutil.rmtree(_scratch, ignore_errors=True)
+
+    machine = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": machine, "results": results}, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {"machine": machine, "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline["machine"] = machine
+        baseline["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    problems = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name}: no baseline entry")
+            continue
+        if "relative" not in baseline[name]:
+            print(f"{name}: baseline predates calibrated timings; re-record it with --update-baseline")
+            continue
+        problems += compare(name, result, baseline[name], args.time_tolerance, args.memory_tolerance)
+
+    if problems:
+        print("\nRegressions:")
+        for p in problems:
+            print(f"  {p}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Paper-trading ledger throughput: one commit per order vs /api/trades/batch.
+
+Run from the repository root (uses a throwaway SQLite file, no network):
+    python -m backend.benchmarks.trade_throughput --orders 2000 --batch-size 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--symbols", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    # Imported after DATABASE_URL is set so the app binds to the throwaway database
+    from backend.main import TradeRequest, BatchTradeRequest, execute_trade, execute_trades_batch
+    from backend.database import SessionLocal, Portfolio
+
+    db = SessionLocal()
+    db.query(Portfolio).first().balance = 1e12
+    db.commit()
+
+    rng = random.Random(42)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+
+    def make_orders(n):
+        # Buys followed by partial sells, so sells hit the FIFO lot matching path
+        orders = []
+        for _ in range(n // 2):
+            sym = rng.choice(symbols)
+            orders.append(TradeRequest(symbol=sym, action="buy", quantity=10, price=rng.uniform(50, 150)))
+            orders.append(TradeRequest(symbol=sym, action="sell", quantity=5, price=rng.uniform(50, 150)))
+        return orders
+
+    # One request (and one commit) per order
+    orders = make_orders(args.orders)
+    start = time.perf_counter()
+    for order in orders:
+        execute_trade(order, db)
+    single = len(orders) / (time.perf_counter() - start)
+
+    # Batched: one transaction per batch
+    orders = make_orders(args.orders)
+    start = time.perf_counter()
+    for i in range(0, len(orders), args.batch_size):
+        execute_trades_batch(BatchTradeRequest(orders=orders[i:i + args.batch_size]), db)
+    batched = len(orders) / (time.perf_counter() - start)
+
+    db.close()
+    print(f"orders:            {len(orders)}")
+    print(f"single (orders/s): {single:,.0f}")
+    print(f"batch  (orders/s): {batched:,.0f}  (batch size {args.batch_size}, {batched / single:.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
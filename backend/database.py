@@ -1,11 +1,46 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime
+import os
+import time
+import logging
+from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Index, Text, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+from .metrics import record
 
-DATABASE_URL = "sqlite:///./terminal.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./terminal.db")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable enough under WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    record("db", _statement_kind(statement), elapsed)
+
+@event.listens_for(engine, "handle_error")
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; pop its start time so the
+    # pooled connection's stack stays paired with the statements that follow
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts and context.statement is not None:
+        record("db", _statement_kind(context.statement), time.perf_counter() - starts.pop())
+
+def _statement_kind(statement):
+    # Label by statement kind (SELECT/INSERT/...) to keep the label set small
+    return statement.lstrip().split(None, 1)[0].upper()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -28,6 +63,10 @@ class Holding(Base):
     option_type = Column(String, nullable=True) # "call" or "put"
     strike = Column(Float, nullable=True)
     expiration = Column(String, nullable=True)
+    
+    # Matches the position lookup in execute_trade / exercise_option
+    __table_args__ = (Index("ix_holdings_position", "portfolio_id", "symbol", "asset_type",
+                            "option_type", "strike", "expiration"),)
 
 class Watchlist(Base):
     __tablename__ = "watchlists"
@@ -49,9 +88,93 @@ class Transaction(Base):
     option_type = Column(String, nullable=True)
     strike = Column(Float, nullable=True)
     expiration = Column(String, nullable=True)
+    
+    __table_args__ = (Index("ix_transactions_timestamp", "timestamp"),
+                      Index("ix_transactions_symbol_timestamp", "symbol", "timestamp"))
+
+class Lot(Base):
+    """Open FIFO lot for realized P&L matching (oldest lot = lowest id)."""
+    __tablename__ = "lots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
+    position_key = Column(String) # symbol, or symbol_type_strike_expiration for options
+    quantity = Column(Integer)
+    price = Column(Float)
+    
+    __table_args__ = (Index("ix_lots_portfolio_position", "portfolio_id", "position_key", "id"),)
+
+class TradeStats(Base):
+    """Running realized P&L stats, updated as lots are closed."""
+    __tablename__ = "trade_stats"
+    
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    realized_pnl = Column(Float, default=0.0)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    consecutive_losses = Column(Integer, default=0)
+    max_consecutive_losses = Column(Integer, default=0)
+
+class TickerMetadata(Base):
+    """Cached yfinance `ticker.info` (sector, names, fundamentals), refreshed on a long TTL."""
+    __tablename__ = "ticker_metadata"
+    
+    symbol = Column(String, primary_key=True)
+    sector = Column(String, nullable=True)
+    info_json = Column(Text)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+class ScoredArticle(Base):
+    """A news article scored once for sentiment, keyed by a hash of its title and summary."""
+    __tablename__ = "scored_articles"
+
+    symbol = Column(String, primary_key=True)
+    content_hash = Column(String, primary_key=True)
+    title = Column(Text)
+    summary = Column(Text)
+    link = Column(String)
+    published_at = Column(Float, default=0)  # epoch seconds, 0 when unknown
+    score = Column(Float)
+    scorer = Column(String)  # what produced `score`; rows from another scorer are rescored on read
+
+    __table_args__ = (Index("ix_scored_articles_symbol_published", "symbol", "published_at"),
+                      Index("ix_scored_articles_hash", "content_hash"))
+
+class NewsWatermark(Base):
+    """Per-symbol high-water mark of stored news: newest publish time and last upstream fetch."""
+    __tablename__ = "news_watermarks"
+
+    symbol = Column(String, primary_key=True)
+    last_published = Column(Float, default=0)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+# Schema migrations for existing databases, applied in order and tracked in PRAGMA user_version.
+# create_all() only creates missing tables, so changes to existing tables go here.
+# Append new steps; never edit or reorder released ones.
+MIGRATIONS = [
+    # 1: composite indexes for position lookups and transaction replay
+    [
+        "CREATE INDEX IF NOT EXISTS ix_holdings_position ON holdings "
+        "(portfolio_id, symbol, asset_type, option_type, strike, expiration)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_timestamp ON transactions (timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_symbol_timestamp ON transactions (symbol, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_lots_portfolio_position ON lots (portfolio_id, position_key, id)",
+    ],
+]
+
+def migrate():
+    """Bring the schema up to len(MIGRATIONS)."""
+    with engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text(f"PRAGMA user_version = {target}"))
+            logging.info(f"Database migrated to schema version {target}")
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate()
     # Create default portfolio if not exists
     db = SessionLocal()
     if not db.query(Portfolio).first():
@@ -0,0 +1,84 @@
+import io
+import json
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Optional fast paths; plain JSON is always available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1000
+
+def negotiate(request: Request):
+    """Pick the response media type from the Accept header (JSON unless a binary format is asked for)."""
+    accept = request.headers.get("accept", "")
+    if ARROW_MEDIA_TYPE in accept and pa is not None:
+        return ARROW_MEDIA_TYPE
+    if (MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept) and msgpack is not None:
+        return MSGPACK_MEDIA_TYPE
+    return "application/json"
+
+def wants_columnar(request: Request, fmt: str = "records"):
+    """Binary formats always carry series as columns; JSON does when format=columnar."""
+    return fmt == "columnar" or negotiate(request) != "application/json"
+
+def to_columnar(df, columns):
+    """{column: [values...]} without repeating keys per row."""
+    return {c: df[c].tolist() for c in columns}
+
+def _arrow_body(payload, table_key):
+    # The series becomes the Arrow table; every other field travels as JSON schema metadata
+    meta = {k: v for k, v in payload.items() if k != table_key}
+    table = pa.table(payload[table_key])
+    table = table.replace_schema_metadata({"meta": json.dumps(jsonable_encoder(meta))})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def encode_response(request: Request, payload: dict, table_key: str = None):
+    """
+    Serialize `payload` in the negotiated format. `table_key` names the
+    columnar series inside the payload (required for Arrow).
+    Brotli is applied when accepted; gzip is handled by the app middleware.
+    """
+    media_type = negotiate(request)
+
+    if media_type == ARROW_MEDIA_TYPE and table_key and isinstance(payload.get(table_key), dict):
+        body = _arrow_body(payload, table_key)
+    elif media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(jsonable_encoder(payload))
+    elif orjson is not None:
+        media_type = "application/json"
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                            default=jsonable_encoder)
+    else:
+        return JSONResponse(jsonable_encoder(payload))
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if brotli is not None and len(body) >= COMPRESS_MIN_BYTES and "br" in request.headers.get("accept-encoding", ""):
+        body = brotli.compress(body, quality=4)
+        headers["Content-Encoding"] = "br"
+    return Response(content=body, media_type=media_type, headers=headers)
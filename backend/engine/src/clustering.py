@@ -1,12 +1,15 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-def build_lstm_data(df, feature_cols, label_col="Cluster", window_size=20):
-    X = []
-    y = []
-    data = df[feature_cols + [label_col]].dropna().values
+def build_lstm_data(df, feature_cols, label_col="Cluster", window_size=20, dtype=np.float32):
+    features = df[feature_cols + [label_col]].dropna()
+    data = features[feature_cols].to_numpy(dtype=dtype, copy=True)
+    labels = features[label_col].to_numpy(dtype=np.int64, copy=True)
 
-    for i in range(window_size, len(data)):
-        X.append(data[i-window_size:i, :-1])  # last 20 rows, all features
-        y.append(data[i, -1])                 # label on day 21
+    # Strided view, no per-window copies: X[j] = data[j:j+window_size], label on the following day.
+    # Writeable so torch can wrap it without copying; `data` is private to this call.
+    windows = sliding_window_view(data, window_size, axis=0, writeable=True)
+    X = windows.transpose(0, 2, 1)[:len(data) - window_size]
+    y = labels[window_size:]
 
-    return np.array(X), np.array(y)
+    return X, y
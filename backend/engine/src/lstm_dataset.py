@@ -1,14 +1,35 @@
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 
 class RegimeDataset(Dataset):
-    def __init__(self,X,Y):
-        self.X= torch.tensor(X, dtype=torch.float)
-        self.Y= torch.tensor(Y, dtype=torch.long)
+    """
+    Either pre-built windows X (N, T, F) with labels Y (N,), or, with
+    `window_size`, raw per-day features (n, F) and labels (n,). In the
+    second form windows are sliced lazily from one shared tensor:
+    item i is features[i:i+window_size] with the label of the next day.
+    """
+    def __init__(self, X, Y, window_size=None, dtype=torch.float32):
+        self.X = torch.as_tensor(np.asarray(X), dtype=dtype)
+        self.Y = torch.as_tensor(np.asarray(Y), dtype=torch.long)
+        self.window_size = window_size
+
+    @classmethod
+    def from_files(cls, features_path, labels_path, window_size, dtype=torch.float32):
+        """Memory-map .npy feature/label files; pages are read on demand as windows are indexed."""
+        # Copy-on-write mapping: writable for torch, never modifies the file
+        X = np.load(features_path, mmap_mode="c")
+        Y = np.load(labels_path, mmap_mode="c")
+        if X.dtype != np.dtype(str(dtype).replace("torch.", "")):
+            raise ValueError(f"{features_path} is {X.dtype}; save features as {dtype} to map them without a copy")
+        return cls(X, Y, window_size=window_size, dtype=dtype)
 
     def __len__(self):
+        if self.window_size:
+            return len(self.X) - self.window_size
         return len(self.X)
 
     def __getitem__(self, idx):
+        if self.window_size:
+            return self.X[idx:idx + self.window_size], self.Y[idx + self.window_size]
         return self.X[idx], self.Y[idx]
-
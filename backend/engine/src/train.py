@@ -0,0 +1,223 @@
+"""
+Train a regime model on CPU.
+
+    python -m src.train --model lstm --data data/data.csv --epochs 25 --workers 2 --threads 4
+    python -m src.train --model transformer --features feats.npy --labels labels.npy --resume
+
+The best checkpoint (by validation loss) is written to <out>/<model>.pt in the
+layout the backend's regime forecast endpoint loads; <out>/<model>.last.pt holds
+the latest epoch, optimizer state included, for --resume.
+"""
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import KMeans
+
+from .lstm_dataset import RegimeDataset
+from .lstm_model import RegimeLSTM
+from .transformer_model import TransformerClassifier
+
+# Same default as backend/regime_model_service.py: <repo>/regime_models
+DEFAULT_OUT = os.environ.get(
+    "REGIME_MODEL_DIR",
+    os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir,
+                                  "regime_models")))
+
+FEATURE_COLS = [
+    "Shannon_Entropy", "Average_Degree", "Network_Entropy",
+    "Mean_Correlation", "Lambda_max", "Lambda_2", "Lambda_3"
+]
+
+MODELS = {
+    "lstm": RegimeLSTM,
+    "transformer": TransformerClassifier,
+}
+
+
+def load_features(path, feature_cols, label_col="Cluster", num_classes=4, seed=42):
+    """Per-day features and regime labels from the engine's feature CSV (labels clustered if absent)."""
+    df = pd.read_csv(path, parse_dates=["Date"]).set_index("Date").sort_index()
+
+    # Eigenvalues may be stored as complex strings, e.g. "(1.23+0j)"
+    for col in ["Lambda_max", "Lambda_2", "Lambda_3"]:
+        if col in df and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].apply(lambda x: float(str(x).replace("(", "").replace(")", "").split("+")[0]))
+
+    df = df.dropna(subset=feature_cols)
+    if label_col not in df:
+        X = StandardScaler().fit_transform(df[feature_cols])
+        df[label_col] = KMeans(n_clusters=num_classes, random_state=seed, n_init=10).fit_predict(X)
+
+    features = df[feature_cols].to_numpy(dtype=np.float32, copy=True)
+    labels = df[label_col].to_numpy(dtype=np.int64, copy=True)
+    return features, labels
+
+def build_model(name, input_dim, num_classes, window_size):
+    config = {"input_dim": input_dim, "num_classes": num_classes}
+    if name == "transformer":
+        config["seq_len"] = window_size
+    return MODELS[name](**config), config
+
+def run_epoch(model, loader, criterion, optimizer=None):
+    """One pass over `loader`; trains when an optimizer is given. Returns (mean loss, accuracy, samples)."""
+    training = optimizer is not None
+    model.train(training)
+    total_loss, correct, seen = 0.0, 0, 0
+    with torch.set_grad_enabled(training):
+        for X_batch, y_batch in loader:
+            outputs = model(X_batch)
+            loss = criterion(outputs, y_batch)
+            if training:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+            total_loss += loss.item() * len(y_batch)
+            correct += (outputs.argmax(dim=1) == y_batch).sum().item()
+            seen += len(y_batch)
+    return total_loss / max(seen, 1), correct / max(seen, 1), seen
+
+def save_checkpoint(path, model, optimizer, config, args, epoch, best_val_loss, stale_epochs, feature_cols):
+    tmp_path = path + ".tmp"
+    torch.save({
+        "model": args.model,
+        "config": config,
+        "state_dict": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "window_size": args.window,
+        "feature_cols": feature_cols,
+        "epoch": epoch,
+        "best_val_loss": best_val_loss,
+        "stale_epochs": stale_epochs,
+    }, tmp_path)
+    os.replace(tmp_path, path)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train a regime model on CPU.")
+    parser.add_argument("--model", choices=sorted(MODELS), default="lstm")
+    parser.add_argument("--data", help="Feature CSV with a Date column (labels clustered if missing)")
+    parser.add_argument("--features", help=".npy float32 per-day features (memory-mapped)")
+    parser.add_argument("--labels", help=".npy int64 per-day regime labels (memory-mapped)")
+    parser.add_argument("--feature-cols", nargs="+", default=FEATURE_COLS)
+    parser.add_argument("--label-col", default="Cluster")
+    parser.add_argument("--num-classes", type=int, default=4)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--epochs", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--val-fraction", type=float, default=0.2, help="Most recent share of windows held out")
+    parser.add_argument("--patience", type=int, default=5, help="Stop after this many epochs without improvement")
+    parser.add_argument("--time-budget", type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--resume", action="store_true", help="Continue from <out>/<model>.last.pt")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if not args.data and not (args.features and args.labels):
+        parser.error("pass --data, or --features and --labels")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.interop_threads:
+        torch.set_num_interop_threads(args.interop_threads)
+    torch.manual_seed(args.seed)
+
+    if args.data:
+        features, labels = load_features(args.data, args.feature_cols, args.label_col, args.num_classes, args.seed)
+        dataset = RegimeDataset(features, labels, window_size=args.window)
+        feature_cols = args.feature_cols
+    else:
+        dataset = RegimeDataset.from_files(args.features, args.labels, args.window)
+        feature_cols = None
+    input_dim = dataset.X.shape[1]
+    num_classes = max(args.num_classes, int(dataset.Y.max()) + 1)
+
+    # Chronological split: validate on the most recent windows
+    n_val = int(len(dataset) * args.val_fraction)
+    n_train = len(dataset) - n_val
+    if n_train <= 0:
+        raise SystemExit(f"Not enough rows for window {args.window}")
+    train_ds = Subset(dataset, range(n_train))
+    val_ds = Subset(dataset, range(n_train, len(dataset)))
+
+    loader_kwargs = {"batch_size": args.batch_size, "num_workers": args.workers,
+                     "persistent_workers": args.workers > 0}
+    train_loader = DataLoader(train_ds, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_ds, **loader_kwargs) if n_val else None
+
+    model, config = build_model(args.model, input_dim, num_classes, args.window)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+
+    os.makedirs(args.out, exist_ok=True)
+    best_path = os.path.join(args.out, f"{args.model}.pt")
+    last_path = os.path.join(args.out, f"{args.model}.last.pt")
+
+    start_epoch, best_val_loss, stale_epochs = 0, float("inf"), 0
+    if args.resume and os.path.exists(last_path):
+        checkpoint = torch.load(last_path, map_location="cpu")
+        model.load_state_dict(checkpoint["state_dict"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        start_epoch = checkpoint["epoch"] + 1
+        best_val_loss = checkpoint["best_val_loss"]
+        stale_epochs = checkpoint["stale_epochs"]
+        print(f"Resumed from {last_path} at epoch {start_epoch + 1}")
+
+    print(f"Training {args.model} on {n_train} windows ({n_val} validation), "
+          f"{torch.get_num_threads()} threads, {args.workers} workers")
+
+    run_start = time.perf_counter()
+    total_samples = 0
+    epoch = start_epoch - 1
+    for epoch in range(start_epoch, args.epochs):
+        epoch_start = time.perf_counter()
+        train_loss, train_acc, seen = run_epoch(model, train_loader, criterion, optimizer)
+        train_time = time.perf_counter() - epoch_start
+        total_samples += seen
+
+        if val_loader is not None:
+            val_loss, val_acc, _ = run_epoch(model, val_loader, criterion)
+        else:
+            val_loss, val_acc = train_loss, train_acc
+        epoch_time = time.perf_counter() - epoch_start
+
+        improved = val_loss < best_val_loss
+        if improved:
+            best_val_loss, stale_epochs = val_loss, 0
+        else:
+            stale_epochs += 1
+
+        save_checkpoint(last_path, model, optimizer, config, args, epoch, best_val_loss, stale_epochs, feature_cols)
+        if improved:
+            save_checkpoint(best_path, model, optimizer, config, args, epoch, best_val_loss, stale_epochs, feature_cols)
+
+        print(f"Epoch {epoch + 1}/{args.epochs} - loss {train_loss:.4f} acc {train_acc:.3f} | "
+              f"val loss {val_loss:.4f} acc {val_acc:.3f} | {epoch_time:.2f}s, "
+              f"{seen / train_time:,.0f} samples/s{' *' if improved else ''}")
+
+        if stale_epochs >= args.patience:
+            print(f"Early stopping: no improvement for {args.patience} epochs")
+            break
+        if args.time_budget and time.perf_counter() - run_start >= args.time_budget:
+            print(f"Time budget of {args.time_budget:.0f}s reached")
+            break
+
+    elapsed = time.perf_counter() - run_start
+    epochs_run = epoch + 1 - start_epoch
+    if epochs_run > 0:
+        print(f"{epochs_run} epochs in {elapsed:.1f}s ({elapsed / epochs_run:.2f}s/epoch, "
+              f"{total_samples / elapsed:,.0f} samples/s overall); best val loss {best_val_loss:.4f} -> {best_path}")
+
+
+if __name__ == "__main__":
+    main()
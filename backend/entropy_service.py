@@ -1,20 +1,40 @@
-import yfinance as yf
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
+from .bar_store import get_close_panel
+from .metrics import timed
 
 SECTORS = [
     "XLE", "XLF", "XLK", "XLV", "XLI", "XLY", "XLP", "XLU", "XLB", "XLRE", "XLC"
 ]
 
+# Computed entropy series are persisted here, one Parquet file per window length
+ENTROPY_STORE_DIR = os.environ.get("ENTROPY_STORE_DIR", "./entropy_store")
+
+# Default history when no start date is given (matches the former 2y download)
+DEFAULT_HISTORY_DAYS = 731
+
+# Regime classifier: fitted once, then new days are only predicted. Every
+# REGIME_REFIT_EVERY new observations it is updated with partial_fit.
+REGIME_REFIT_EVERY = int(os.environ.get("REGIME_REFIT_EVERY", 20))
+REGIME_NAMES = {0: "Low Entropy (Structured)", 1: "Neutral", 2: "High Entropy (Random/Noise)"}
+
+_series = {}        # window -> DataFrame indexed by Date with Entropy and Regime_ID columns
+_classifiers = {}   # window -> {"model": MiniBatchKMeans, "fitted_through": Timestamp}
+_covered_from = {}  # window -> earliest date already computed (or known to have no data)
+_series_lock = threading.Lock()
+
 def get_market_data(period="2y", start=None, end=None):
     """Fetch close prices for sector ETFs."""
     if start:
-        # yfinance expects YYYY-MM-DD string
-        data = yf.download(SECTORS, start=start, end=end, progress=False)['Close']
+        data = get_close_panel(SECTORS, start=start, end=end)
     else:
-        data = yf.download(SECTORS, period=period, progress=False)['Close']
+        data = get_close_panel(SECTORS, period=period)
     return data
 
 def calculate_entropy(prob_vector):
@@ -23,65 +43,219 @@ def calculate_entropy(prob_vector):
     prob_vector = prob_vector[prob_vector > 0]
     return -np.sum(prob_vector * np.log2(prob_vector))
 
-def compute_market_entropy(window=20, start_date=None, end_date=None):
-    """
-    Compute rolling entropy of the correlation matrix eigenvalues.
+def batched_correlation(windows):
+    """Correlation matrices for a stack of windows shaped (m, assets, window_len)."""
+    centered = windows - windows.mean(axis=-1, keepdims=True)
+    cov = centered @ centered.transpose(0, 2, 1)
+    std = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+    return cov / (std[:, :, None] * std[:, None, :])
+
+def rolling_entropy(returns, window=20, after=None, before=None):
     """
-    # Determine fetch range
-    fetch_start = None
-    fetch_end = end_date
+    Entropy of the eigenvalues of each rolling correlation window.
+    The value dated returns.index[i] uses the `window` rows before it.
+    Only dates strictly between `after` and `before` are computed.
     
-    if start_date:
-        # Add buffer for rolling window (approx 2 months to be safe for 20 trading days)
-        # We need enough data BEFORE start_date to calculate the first window
-        from datetime import timedelta
-        s_dt = pd.to_datetime(start_date)
-        fetch_start = (s_dt - timedelta(days=60)).strftime('%Y-%m-%d')
-        
-    df = get_market_data(start=fetch_start, end=fetch_end)
+    Windows are strided views over the returns array; all correlation
+    matrices are built in one batch and decomposed with a single stacked
+    eigvalsh call.
+    """
+    dates = returns.index[window:]
+    keep = np.ones(len(dates), dtype=bool)
+    if after is not None:
+        keep &= dates > after
+    if before is not None:
+        keep &= dates < before
+    positions = np.flatnonzero(keep)
     
-    # Calculate returns
-    returns = df.pct_change().dropna()
+    if len(positions) == 0:
+        return pd.DataFrame({'Entropy': []}, index=pd.DatetimeIndex([], name='Date'))
     
-    entropy_series = []
-    dates = []
+    # (n - window + 1, assets, window) view; window j covers rows j..j+window-1 and is dated row j+window
+    values = returns.to_numpy(dtype=float)
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)[positions]
     
-    # Rolling window
-    for i in range(window, len(returns)):
-        window_data = returns.iloc[i-window:i]
-        
-        # Correlation matrix
-        corr_matrix = window_data.corr()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = batched_correlation(windows)
         
         # Eigenvalues
-        eigvals = np.linalg.eigvalsh(corr_matrix)
+        eigvals = np.linalg.eigvalsh(corr)
         
         # Normalize eigenvalues to sum to 1 (probabilities)
         eigvals = np.abs(eigvals)
-        eigvals = eigvals / np.sum(eigvals)
-        
-        # Entropy
-        H = calculate_entropy(eigvals)
-        
-        entropy_series.append(H)
-        dates.append(returns.index[i])
+        p = eigvals / eigvals.sum(axis=1, keepdims=True)
         
-    results = pd.DataFrame({'Date': dates, 'Entropy': entropy_series})
+        # Entropy (terms with p == 0 contribute nothing)
+        H = -np.sum(np.where(p > 0, p * np.log2(np.where(p > 0, p, 1.0)), 0.0), axis=1)
+    
+    results = pd.DataFrame({'Date': dates[positions], 'Entropy': H})
     results.set_index('Date', inplace=True)
+    return results
+
+def _store_path(window):
+    return os.path.join(ENTROPY_STORE_DIR, f"entropy_w{window}.parquet")
+
+def _load_series(window):
+    if window not in _series:
+        path = _store_path(window)
+        if os.path.exists(path):
+            stored = pd.read_parquet(path)
+            _series[window] = stored
+            _covered_from[window] = stored.index[0] if not stored.empty else None
+        else:
+            _series[window] = None
+    return _series[window]
+
+def _save_series(window, series):
+    os.makedirs(ENTROPY_STORE_DIR, exist_ok=True)
+    path = _store_path(window)
+    tmp_path = f"{path}.tmp"
+    series.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+def _classifier_path(window):
+    return os.path.join(ENTROPY_STORE_DIR, f"regime_w{window}.pkl")
+
+def _load_classifier(window):
+    if window not in _classifiers:
+        path = _classifier_path(window)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                _classifiers[window] = pickle.load(f)
+        else:
+            _classifiers[window] = None
+    return _classifiers[window]
+
+def _save_classifier(window, clf):
+    os.makedirs(ENTROPY_STORE_DIR, exist_ok=True)
+    path = _classifier_path(window)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(clf, f)
+    os.replace(tmp_path, path)
+    _classifiers[window] = clf
+
+def _regime_ids(model, entropy):
+    # Rank clusters by center so IDs always mean Low / Neutral / High entropy, whatever KMeans numbered them
+    rank = np.argsort(np.argsort(model.cluster_centers_.ravel()))
+    with timed("kmeans", "predict"):
+        return rank[model.predict(np.asarray(entropy, dtype=float).reshape(-1, 1))]
+
+def _update_regimes(window, series):
+    """
+    Assign Regime_ID to rows that don't have one (predict only) and fold
+    new observations into the classifier once enough have accumulated.
+    Existing labels are never rewritten.
+    """
+    if len(series) < 3:
+        return series
+    series = series.copy()
+    if 'Regime_ID' not in series:
+        series['Regime_ID'] = np.nan
+    
+    clf = _load_classifier(window)
+    if clf is None:
+        model = MiniBatchKMeans(n_clusters=3, random_state=42, n_init=3)
+        with timed("kmeans", "fit"):
+            model.fit(series[['Entropy']].values)
+        clf = {"model": model, "fitted_through": series.index[-1]}
+        _save_classifier(window, clf)
+    
+    unlabeled = series['Regime_ID'].isna().to_numpy()
+    if unlabeled.any():
+        series.loc[unlabeled, 'Regime_ID'] = _regime_ids(clf["model"], series.loc[unlabeled, 'Entropy'])
+    
+    new_obs = series.index > clf["fitted_through"]
+    if new_obs.sum() >= REGIME_REFIT_EVERY:
+        with timed("kmeans", "partial_fit"):
+            clf["model"].partial_fit(series.loc[new_obs, ['Entropy']].values)
+        clf["fitted_through"] = series.index[-1]
+        _save_classifier(window, clf)
+    
+    return series
+
+def _returns_since(start, end=None, window=20):
+    # Buffer so the first requested date has a full window before it
+    fetch_start = (start - timedelta(days=window * 3)).strftime('%Y-%m-%d')
+    fetch_end = end.strftime('%Y-%m-%d') if end is not None else None
+    df = get_market_data(start=fetch_start, end=fetch_end)
+    return df.pct_change().dropna()
+
+def get_entropy_series(window=20, start=None):
+    """
+    Stored entropy series extended to cover [start, latest bar].
+    Past values never change, so only windows missing from the store
+    (new trading days, or an earlier start) are computed.
+    """
+    if start is None:
+        start = pd.Timestamp(datetime.now().date()) - timedelta(days=DEFAULT_HISTORY_DAYS)
+    start = pd.to_datetime(start)
     
-    # Determine Regimes using simple quantiles or KMeans
-    X = results[['Entropy']].values
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    results['Cluster'] = kmeans.fit_predict(X)
+    with _series_lock:
+        series = _load_series(window)
+        parts = []
+        
+        if series is None or series.empty:
+            series = rolling_entropy(_returns_since(start, window=window), window=window, after=start - timedelta(days=1))
+            _covered_from[window] = start
+            changed = not series.empty
+        else:
+            # Tail: new trading days since the last stored value
+            last = series.index[-1]
+            parts.append(rolling_entropy(_returns_since(last, window=window), window=window, after=last))
+            
+            # Head: an earlier start than anything computed so far
+            covered = _covered_from.get(window)
+            if covered is None or start < covered:
+                first = series.index[0]
+                parts.append(rolling_entropy(_returns_since(start, end=first, window=window), window=window,
+                                             after=start - timedelta(days=1), before=first))
+                _covered_from[window] = start
+            
+            parts = [p for p in parts if not p.empty]
+            changed = bool(parts)
+            if changed:
+                series = pd.concat([series] + parts).sort_index()
+        
+        if changed or (not series.empty and 'Regime_ID' not in series):
+            series = _update_regimes(window, series)
+            _save_series(window, series)
+        _series[window] = series
+        return series
+
+def compute_market_entropy(window=20, start_date=None, end_date=None):
+    """
+    Compute rolling entropy of the correlation matrix eigenvalues.
+    """
+    # Range served: start minus a buffer, or the default history
+    if start_date:
+        fit_start = pd.to_datetime(start_date) - timedelta(days=60)
+    else:
+        fit_start = pd.Timestamp(datetime.now().date()) - timedelta(days=DEFAULT_HISTORY_DAYS)
     
-    # Map clusters to meaningful labels (Low, Med, High Entropy)
-    cluster_means = results.groupby('Cluster')['Entropy'].mean().sort_values()
+    series = get_entropy_series(window=window, start=fit_start)
+    results = series[series.index >= fit_start]
+    if end_date:
+        results = results[results.index <= pd.to_datetime(end_date)]
+    results = results.copy()
     
-    mapping = {original: new for new, original in enumerate(cluster_means.index)}
-    results['Regime_ID'] = results['Cluster'].map(mapping)
+    if results.empty:
+        return {
+            "current_state": "Insufficient Data",
+            "current_entropy": 0.0,
+            "data": []
+        }
     
-    regime_map = {0: "Low Entropy (Structured)", 1: "Neutral", 2: "High Entropy (Random/Noise)"}
-    results['Regime'] = results['Regime_ID'].map(regime_map)
+    # Regimes come from the persisted classifier (0 = lowest-entropy cluster)
+    if 'Regime_ID' not in results or results['Regime_ID'].isna().any():
+        return {
+            "current_state": "Insufficient Data",
+            "current_entropy": float(results.iloc[-1]['Entropy']),
+            "data": []
+        }
+    results['Regime_ID'] = results['Regime_ID'].astype(int)
+    results['Cluster'] = results['Regime_ID']
+    results['Regime'] = results['Regime_ID'].map(REGIME_NAMES)
     
     # Filter by date if provided
     if start_date:
@@ -105,3 +279,15 @@ def compute_market_entropy(window=20, start_date=None, end_date=None):
         "current_entropy": float(results.iloc[-1]['Entropy']),
         "data": results_reset.to_dict(orient='records')
     }
+
+def compute_multi_window_entropy(windows=(10, 20, 60), start_date=None, end_date=None):
+    """compute_market_entropy for several window lengths, keyed by window."""
+    for window in windows:
+        if window < 2:
+            raise ValueError(f"Window must be at least 2 days, got {window}")
+    return {
+        "windows": {
+            str(window): compute_market_entropy(window=window, start_date=start_date, end_date=end_date)
+            for window in windows
+        }
+    }
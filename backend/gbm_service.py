@@ -0,0 +1,40 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+
+def simulate_paths(last_price, mu, sigma, days, simulations, seed=None, dt=1.0):
+    """
+    Generate Geometric Brownian Motion price paths in one shot.
+
+    Returns an array of shape (simulations, days + 1) whose first column is
+    `last_price`. `seed` makes runs reproducible.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Log-returns for every (path, step), accumulated in place
+    log_returns = rng.standard_normal((simulations, days))
+    log_returns *= sigma * np.sqrt(dt)
+    log_returns += (mu - 0.5 * sigma ** 2) * dt
+    np.cumsum(log_returns, axis=1, out=log_returns)
+
+    paths = np.empty((simulations, days + 1))
+    paths[:, 0] = last_price
+    np.exp(log_returns, out=paths[:, 1:])
+    paths[:, 1:] *= last_price
+    return paths
+
+def path_dates(days, start_date=None):
+    """Calendar dates (YYYY-MM-DD) for each step of a simulated path."""
+    start_date = start_date or datetime.now()
+    return [(start_date + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days + 1)]
+
+def quantile_bands(paths, percentiles=BAND_PERCENTILES):
+    """Per-step percentile bands across all paths, keyed p5/p25/..."""
+    bands = np.percentile(paths, percentiles, axis=0)
+    return {f"p{p}": band.tolist() for p, band in zip(percentiles, bands)}
+
+def terminal_histogram(paths, bins=50):
+    """Histogram of the final simulated prices."""
+    counts, edges = np.histogram(paths[:, -1], bins=bins)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
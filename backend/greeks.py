@@ -57,3 +57,56 @@ def calculate_greeks(S, K, T, r, sigma, option_type="call"):
         "vega": float(vega),
         "rho": float(rho)
     }
+
+def calculate_greeks_array(S, K, T, r, sigma, is_call):
+    """
+    Vectorized Black-Scholes Greeks for many options at once.
+    
+    Parameters:
+    S : float or array : Current stock price
+    K : array : Strike prices
+    T : float or array : Time to expiration in years
+    r : float : Risk-free interest rate (decimal)
+    sigma : array : Implied Volatilities (decimal)
+    is_call : bool array : True for calls, False for puts
+    
+    Returns:
+    dict : Delta, Gamma, Theta, Vega, Rho as float arrays (same scaling as
+    calculate_greeks). Rows with T <= 0 or sigma <= 0 are NaN.
+    """
+    K = np.asarray(K, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    S = np.asarray(S, dtype=float)
+    T = np.asarray(T, dtype=float)
+    S, T, K, sigma, is_call = np.broadcast_arrays(S, T, K, sigma, is_call)
+    
+    valid = (T > 0) & (sigma > 0)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_T = np.sqrt(T)
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+        d2 = d1 - sigma * sqrt_T
+        
+        pdf_d1 = norm.pdf(d1)
+        cdf_d1 = norm.cdf(d1)
+        cdf_d2 = norm.cdf(d2)
+        discount = K * np.exp(-r * T)
+        
+        # Put values follow from call values via N(-x) = 1 - N(x)
+        delta = np.where(is_call, cdf_d1, cdf_d1 - 1)
+        rho = np.where(is_call, discount * T * cdf_d2, -discount * T * (1 - cdf_d2))
+        decay = -(S * pdf_d1 * sigma) / (2 * sqrt_T)
+        theta = np.where(is_call, decay - r * discount * cdf_d2, decay + r * discount * (1 - cdf_d2))
+        
+        gamma = pdf_d1 / (S * sigma * sqrt_T)
+        vega = S * pdf_d1 * sqrt_T
+    
+    greeks = {
+        "delta": delta,
+        "gamma": gamma,
+        "theta": theta / 365.0,
+        "vega": vega / 100.0,
+        "rho": rho
+    }
+    return {k: np.where(valid, v, np.nan) for k, v in greeks.items()}
@@ -0,0 +1,169 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from .database import SessionLocal, Portfolio, Holding, Transaction, Lot, TradeStats
+
+# Incremental FIFO lot ledger. Trades open/close persisted lots and update
+# TradeStats in the caller's session, so they commit atomically with the
+# holding and balance changes. Portfolio reads never replay transactions.
+
+def position_key(symbol, asset_type="stock", option_type=None, strike=None, expiration=None):
+    if asset_type == "option":
+        return f"{symbol}_{option_type}_{strike}_{expiration}"
+    return symbol
+
+def get_stats(db: Session, portfolio_id):
+    stats = db.get(TradeStats, portfolio_id)
+    if stats is None:
+        stats = TradeStats(portfolio_id=portfolio_id, realized_pnl=0.0, wins=0, losses=0,
+                           consecutive_losses=0, max_consecutive_losses=0)
+        db.add(stats)
+        db.flush()
+    return stats
+
+def open_lot(db: Session, portfolio_id, key, quantity, price):
+    db.add(Lot(portfolio_id=portfolio_id, position_key=key, quantity=quantity, price=price))
+
+def close_lots(db: Session, portfolio_id, key, quantity, price):
+    """Match `quantity` against the oldest open lots at `price`, recording realized P&L."""
+    stats = get_stats(db, portfolio_id)
+    db.flush() # Sessions don't autoflush; make lots opened in this transaction visible
+    lots = (db.query(Lot)
+            .filter(Lot.portfolio_id == portfolio_id, Lot.position_key == key)
+            .order_by(Lot.id)
+            .all())
+    _match_lots(db, stats, lots, quantity, price)
+
+def _match_lots(db: Session, stats, lots, quantity, price):
+    """Consume `quantity` from the front of `lots` (oldest first); returns how many lots were fully sold."""
+    qty_to_sell = quantity
+    closed = 0
+    for lot in lots:
+        if qty_to_sell <= 0:
+            break
+        matched_qty = min(qty_to_sell, lot.quantity)
+
+        # Calculate P&L for this chunk
+        _record_pnl(stats, (price - lot.price) * matched_qty)
+
+        if matched_qty == lot.quantity:
+            _discard(db, lot) # Fully sold this lot
+            closed += 1
+        else:
+            lot.quantity -= matched_qty # Partially sold
+        qty_to_sell -= matched_qty
+    return closed
+
+def holding_key(symbol, asset_type="stock", option_type=None, strike=None, expiration=None):
+    # Stock holdings match on symbol and asset type only, options on the full contract
+    if asset_type == "option":
+        return (symbol, asset_type, option_type, strike, expiration)
+    return (symbol, asset_type)
+
+class PositionBook:
+    """
+    Holdings and open lots for a set of positions, each given as
+    (symbol, asset_type, option_type, strike, expiration). Both are loaded in
+    one query each and then updated in memory, so a batch of orders needs no
+    per-order queries or flushes. Changes go through the caller's session and
+    are written when it flushes or commits.
+    """
+
+    def __init__(self, db: Session, portfolio_id, positions):
+        self.db = db
+        self.portfolio_id = portfolio_id
+        self.stats = get_stats(db, portfolio_id)
+        positions = set(positions)
+        db.flush() # Sessions don't autoflush; include rows added earlier in this transaction
+
+        self.holdings = {}
+        symbols = sorted({p[0] for p in positions})
+        for h in db.query(Holding).filter(Holding.portfolio_id == portfolio_id, Holding.symbol.in_(symbols)):
+            self.holdings.setdefault(holding_key(h.symbol, h.asset_type, h.option_type, h.strike, h.expiration), h)
+
+        self.lots = {}
+        keys = sorted({position_key(*p) for p in positions})
+        for lot in (db.query(Lot)
+                    .filter(Lot.portfolio_id == portfolio_id, Lot.position_key.in_(keys))
+                    .order_by(Lot.id)):
+            self.lots.setdefault(lot.position_key, []).append(lot)
+
+    def holding(self, key):
+        return self.holdings.get(key)
+
+    def add_holding(self, key, holding):
+        self.db.add(holding)
+        self.holdings[key] = holding
+
+    def remove_holding(self, key):
+        _discard(self.db, self.holdings.pop(key))
+
+    def open_lot(self, key, quantity, price):
+        lot = Lot(portfolio_id=self.portfolio_id, position_key=key, quantity=quantity, price=price)
+        self.db.add(lot)
+        self.lots.setdefault(key, []).append(lot)
+
+    def close_lots(self, key, quantity, price):
+        """close_lots against the in-memory lots, oldest first."""
+        lots = self.lots.get(key, [])
+        del lots[:_match_lots(self.db, self.stats, lots, quantity, price)]
+
+def _discard(db: Session, obj):
+    # Rows added earlier in the same unflushed batch were never written; just forget them
+    if inspect(obj).pending:
+        db.expunge(obj)
+    else:
+        db.delete(obj)
+
+def drop_lots(db: Session, portfolio_id, key):
+    """Remove all open lots for a position without realizing P&L (e.g. exercised options)."""
+    db.query(Lot).filter(Lot.portfolio_id == portfolio_id, Lot.position_key == key).delete()
+
+def _record_pnl(stats, pnl):
+    stats.realized_pnl += pnl
+    if pnl > 0:
+        stats.wins += 1
+        stats.consecutive_losses = 0
+    elif pnl < 0:
+        stats.losses += 1
+        stats.consecutive_losses += 1
+        stats.max_consecutive_losses = max(stats.max_consecutive_losses, stats.consecutive_losses)
+
+def backfill_ledger():
+    """
+    One-off migration for databases created before the ledger existed:
+    replay the transaction history once to seed lots and stats.
+    """
+    db = SessionLocal()
+    try:
+        portfolio = db.query(Portfolio).first()
+        if not portfolio or db.get(TradeStats, portfolio.id) is not None:
+            return
+
+        stats = get_stats(db, portfolio.id)
+        inventory = {} # key -> list of [quantity, price], consumed from `heads[key]`
+        heads = {}
+
+        for t in db.query(Transaction).order_by(Transaction.timestamp):
+            key = position_key(t.symbol, t.asset_type, t.option_type, t.strike, t.expiration)
+            if t.action == "buy":
+                inventory.setdefault(key, []).append([t.quantity, t.price])
+                heads.setdefault(key, 0)
+            elif t.action == "sell":
+                qty_to_sell = t.quantity
+                lots = inventory.get(key, [])
+                while qty_to_sell > 0 and heads.get(key, 0) < len(lots):
+                    lot = lots[heads[key]]
+                    matched_qty = min(qty_to_sell, lot[0])
+                    _record_pnl(stats, (t.price - lot[1]) * matched_qty)
+                    if matched_qty == lot[0]:
+                        heads[key] += 1
+                    else:
+                        lot[0] -= matched_qty
+                    qty_to_sell -= matched_qty
+
+        for key, lots in inventory.items():
+            for quantity, price in lots[heads[key]:]:
+                open_lot(db, portfolio.id, key, quantity, price)
+        db.commit()
+    finally:
+        db.close()
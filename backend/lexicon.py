@@ -0,0 +1,113 @@
+import re
+from itertools import chain, repeat
+import numpy as np
+
+# Same cleaning as sentiment_service.preprocess_text: lowercase, keep letters and whitespace
+_NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+_NON_ALPHA_RUN = re.compile(r'[^a-zA-Z\s]+')
+# ASCII fast path: the bytes that regex removes, deleted with bytes.translate
+_ASCII_DELETE = bytes(b for b in range(128) if not (chr(b).isascii() and chr(b).isalpha()) and not chr(b).isspace())
+
+# A batch is joined into one string around this word so cleaning and splitting
+# run once; it is all letters, so it survives the cleaning as its own token.
+_DOC_SEP = "qxdocsepqx"
+
+
+class LexiconScorer:
+    """
+    Batch sentiment scorer over a fixed, weighted lexicon.
+
+    The vocabulary is compiled once into id -> weight arrays. A batch is
+    tokenized in one pass, token ids are looked up in bulk, and per-text sums
+    come from one bincount over the flattened tokens: the sparse doc-term
+    matrix times the weight vector, without building the matrix. Bigram
+    weights are added on top of their words' weights. A term within
+    `negation_window` tokens after a negation word counts with its sign flipped.
+    """
+
+    def __init__(self, weights, bigrams=None, negations=(), negation_window=3, step=0.1):
+        bigrams = bigrams or {}
+        terms = set(weights) | set(negations) | {w for pair in bigrams for w in pair}
+        # Id 0 is every word outside the lexicon; the last id is the text separator
+        self.vocab = {w: i for i, w in enumerate(sorted(terms), start=1)}
+        self.sep_id = len(self.vocab) + 1
+        self.vocab[_DOC_SEP] = self.sep_id
+        n = self.sep_id + 1
+
+        self.term_weights = np.zeros(n)
+        for w, weight in weights.items():
+            self.term_weights[self.vocab[w]] = weight
+
+        self.is_negation = np.zeros(n, dtype=bool)
+        for w in negations:
+            self.is_negation[self.vocab[w]] = True
+
+        # Bigrams are looked up by the key first_id * n + second_id in a sorted array
+        keys = np.array([self.vocab[a] * n + self.vocab[b] for a, b in bigrams], dtype=np.int64)
+        order = np.argsort(keys)
+        self.bigram_keys = keys[order]
+        self.bigram_weights = np.array(list(bigrams.values()), dtype=float)[order]
+
+        self.negation_window = negation_window
+        self.step = step
+
+    def _ids(self, tokens, count=-1):
+        return np.fromiter(map(self.vocab.get, tokens, repeat(0)), dtype=np.int32, count=count)
+
+    def _raw_scores(self, ids, n_docs):
+        """
+        Summed term weights per text for one flat id array in which texts are
+        separated by sep_id (which carries no weight, negation or bigram).
+        """
+        if n_docs == 0:
+            return np.zeros(0)
+        is_sep = ids == self.sep_id
+        doc_ids = np.cumsum(is_sep, dtype=np.int32)
+        contrib = self.term_weights[ids]
+
+        if len(self.bigram_keys) and len(ids) > 1:
+            # Bigram of token i and i+1, credited to token i (never spans texts: the separator is no bigram word)
+            keys = ids[:-1].astype(np.int64) * len(self.term_weights) + ids[1:]
+            slot = np.searchsorted(self.bigram_keys, keys)
+            slot[slot == len(self.bigram_keys)] = 0
+            hit = np.flatnonzero(self.bigram_keys[slot] == keys)
+            contrib[hit] += self.bigram_weights[slot[hit]]
+
+        neg = self.is_negation[ids]
+        if neg.any():
+            # Distance back to the nearest negation word, which must come after the last separator
+            pos = np.arange(len(ids), dtype=np.int32)
+            last_neg = np.maximum.accumulate(np.where(neg, pos, -1))
+            last_sep = np.maximum.accumulate(np.where(is_sep, pos, -1))
+            dist = pos - last_neg
+            negated = (last_neg > last_sep) & (dist > 0) & (dist <= self.negation_window)
+            contrib[negated] *= -1
+
+        return np.bincount(doc_ids, weights=contrib, minlength=n_docs)
+
+    def _scale(self, raw):
+        # 0.5 shifted by `step` per unit of weight, clamped to [0, 1]
+        return np.clip(0.5 + self.step * raw, 0.0, 1.0)
+
+    def score_tokens(self, token_lists):
+        """Scores in [0, 1] for already tokenized texts."""
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        ids = self._ids(chain.from_iterable(token_lists), int(lengths.sum()))
+        # A literal separator word in the input is just an unknown word here
+        ids[ids == self.sep_id] = 0
+        ids = np.insert(ids, np.cumsum(lengths)[:-1], self.sep_id)
+        return self._scale(self._raw_scores(ids, len(token_lists)))
+
+    def score_batch(self, texts):
+        """Scores in [0, 1] for raw texts, tokenized as preprocess_text does."""
+        joined = f" {_DOC_SEP} ".join(texts).lower()
+        if joined.isascii():
+            cleaned = joined.encode('ascii').translate(None, _ASCII_DELETE).decode('ascii')
+        else:
+            cleaned = _NON_ALPHA_RUN.sub('', joined)
+        tokens = cleaned.split()
+        ids = self._ids(tokens, len(tokens))
+        if texts and np.count_nonzero(ids == self.sep_id) != len(texts) - 1:
+            # A text contained the separator word itself
+            return self.score_tokens([_NON_ALPHA.sub('', t.lower()).split() for t in texts])
+        return self._scale(self._raw_scores(ids, len(texts)))
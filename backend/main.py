@@ -1,12 +1,23 @@
-from fastapi import FastAPI, HTTPException, Body, Depends
+from fastapi import FastAPI, HTTPException, Body, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
+import asyncio
 import numpy as np
 import pandas as pd
-import yfinance as yf
+import json
+import time
 import logging
 from sqlalchemy.orm import Session
-from .database import init_db, get_db, Portfolio, Holding, Transaction, Watchlist
+from .database import init_db, get_db, SessionLocal, Portfolio, Holding, Transaction, Watchlist
+from .bar_store import get_bars
+from .quote_service import get_quotes
+from .singleflight import singleflight, run_blocking
+from .encoding import encode_response, wants_columnar, to_columnar
+from .ledger import (position_key, holding_key, PositionBook, open_lot, close_lots, drop_lots, get_stats,
+                     backfill_ledger)
+from .metrics import REQUEST_LATENCY, PROMETHEUS_CONTENT_TYPE, start_request, server_timing, render
 
 # Setup
 app = FastAPI(title="The Terminal")
@@ -14,6 +25,7 @@ logging.basicConfig(level=logging.INFO)
 
 # Initialize DB
 init_db()
+backfill_ledger()
 
 # CORS
 app.add_middleware(
@@ -24,6 +36,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON payloads (brotli responses are already encoded and skipped)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Latency per route template (not raw path, so /api/options/{symbol} is one series)
+# plus a Server-Timing header breaking the request down by dependency
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    timings = start_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(elapsed, request.method, getattr(route, "path", "unmatched"), str(status))
+    response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
 # --- Models ---
 class TradeRequest(BaseModel):
     symbol: str
@@ -39,6 +72,9 @@ class SimulationRequest(BaseModel):
     symbol: str
     days: int = 30
     simulations: int = 5
+    seed: int = None
+    mode: str = "paths"  # "paths" (every path) or "bands" (percentiles + terminal histogram)
+    bins: int = 50
 
 class WatchlistRequest(BaseModel):
     symbols: list[str]
@@ -49,19 +85,28 @@ class WatchlistRequest(BaseModel):
 def read_root():
     return {"status": "running", "msg": "The Terminal Backend"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/api/market-data/{symbol}")
-def get_market_data(symbol: str):
+async def get_market_data(symbol: str, request: Request, format: str = "records"):
+    # format=columnar (or an Arrow/MessagePack Accept header) returns {date: [...], open: [...], ...}
+    columnar = wants_columnar(request, format)
+    payload = await singleflight(("market-data", symbol, columnar), _get_market_data, symbol, columnar)
+    return encode_response(request, payload, table_key="data")
+
+def _get_market_data(symbol: str, columnar: bool = False):
     try:
-        # Fetch historical data (last 1 year) using yfinance directly
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period="1y")
+        # Fetch historical data (last 1 year) from the local bar store
+        df = get_bars(symbol, period="1y")
         
         if df.empty:
              raise HTTPException(status_code=404, detail="Symbol not found or no data")
 
         # Format for chart (time, open, high, low, close)
-        # Reset index to get date as column
-        df.reset_index(inplace=True)
+        # Reset index to get date as column (returns a new frame, store stays untouched)
+        df = df.reset_index()
         # Ensure column names are lowercase
         df.columns = [c.lower() for c in df.columns]
         
@@ -69,17 +114,25 @@ def get_market_data(symbol: str):
         # Lightweight charts expects seconds or YYYY-MM-DD string
         df['date'] = df['date'].dt.strftime('%Y-%m-%d')
         
-        data = df[['date', 'open', 'high', 'low', 'close', 'volume']].to_dict(orient='records')
+        columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+        if columnar:
+            data = to_columnar(df, columns)
+        else:
+            data = df[columns].to_dict(orient='records')
+        
+        # Get stock info (cached in the database, refreshed daily in the background)
+        from .metadata_service import get_metadata
+        info = get_metadata(symbol)
         
-        # Get stock info
-        info = ticker.info
+        # Intraday fields come from the latest bar, which is fresher than the cached info
+        last_bar = df.iloc[-1]
         stats = {
             "marketCap": info.get("marketCap"),
             "peRatio": info.get("trailingPE"),
             "dividendYield": info.get("dividendYield"),
             "fiftyTwoWeekHigh": info.get("fiftyTwoWeekHigh"),
             "fiftyTwoWeekLow": info.get("fiftyTwoWeekLow"),
-            "volume": info.get("volume"),
+            "volume": float(last_bar['volume']),
             "avgVolume": info.get("averageVolume"),
             "shortName": info.get("shortName"),
             "longName": info.get("longName"),
@@ -87,10 +140,10 @@ def get_market_data(symbol: str):
             "industry": info.get("industry"),
             "description": info.get("longBusinessSummary"),
             "currency": info.get("currency"),
-            "currentPrice": info.get("currentPrice", df['close'].iloc[-1] if not df.empty else None),
-            "open": info.get("open"),
-            "dayHigh": info.get("dayHigh"),
-            "dayLow": info.get("dayLow"),
+            "currentPrice": float(last_bar['close']),
+            "open": float(last_bar['open']),
+            "dayHigh": float(last_bar['high']),
+            "dayLow": float(last_bar['low']),
         }
         
         return {"symbol": symbol, "data": data, "info": stats}
@@ -99,84 +152,72 @@ def get_market_data(symbol: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/simulate/gbm")
-def simulate_gbm(req: SimulationRequest):
+async def simulate_gbm(req: SimulationRequest):
+    return await singleflight(("gbm", req.model_dump_json()), _simulate_gbm, req)
+
+def _simulate_gbm(req: SimulationRequest):
     try:
+        from .gbm_service import simulate_paths, path_dates, quantile_bands, terminal_histogram
+
         # Get recent data to calculate drift and volatility
-        ticker = yf.Ticker(req.symbol)
-        df = ticker.history(period="1y")
-        prices = df['Close']
+        prices = get_bars(req.symbol, period="1y")['Close']
         
         # Calculate returns
         returns = prices.pct_change().dropna()
         mu = returns.mean()
         sigma = returns.std()
         
-        last_price = prices.iloc[-1]
-        dt = 1  # 1 day
-        
-        from datetime import datetime, timedelta
-        
-        simulations = []
-        start_date = datetime.now()
-        
-        for _ in range(req.simulations):
-            price_path = []
-            current_price = last_price
-            
-            # Initial point (today)
-            price_path.append({
-                "time": start_date.strftime('%Y-%m-%d'),
-                "value": float(current_price)
-            })
-            
-            for i in range(1, req.days + 1):
-                drift = (mu - 0.5 * sigma**2) * dt
-                shock = sigma * np.sqrt(dt) * np.random.normal()
-                current_price = current_price * np.exp(drift + shock)
-                
-                # Future date
-                future_date = start_date + timedelta(days=i)
-                
-                price_path.append({
-                    "time": future_date.strftime('%Y-%m-%d'),
-                    "value": float(current_price)
-                })
-            simulations.append(price_path)
+        last_price = float(prices.iloc[-1])
+        
+        paths = simulate_paths(last_price, mu, sigma, req.days, req.simulations, seed=req.seed)
+        dates = path_dates(req.days)
+        
+        if req.mode == "bands":
+            # Summary only: payload size no longer grows with the number of paths
+            return {
+                "symbol": req.symbol,
+                "dates": dates,
+                "bands": quantile_bands(paths),
+                "terminal_histogram": terminal_histogram(paths, bins=req.bins),
+                "simulations": req.simulations
+            }
+        
+        simulations = [
+            [{"time": d, "value": v} for d, v in zip(dates, path)]
+            for path in paths.tolist()
+        ]
             
         return {"symbol": req.symbol, "simulations": simulations}
     except Exception as e:
         logging.error(f"GBM Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/trade")
-def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
+def get_or_create_portfolio(db: Session):
     portfolio = db.query(Portfolio).first()
     if not portfolio:
         portfolio = Portfolio(balance=100000.0)
         db.add(portfolio)
         db.commit()
-        
+    return portfolio
+
+def _position(trade: TradeRequest):
+    return (trade.symbol, trade.asset_type, trade.option_type, trade.strike, trade.expiration)
+
+def apply_trade(db: Session, portfolio: Portfolio, trade: TradeRequest, book: PositionBook):
+    """
+    Apply one order to the session without committing; `book` must cover the order's position.
+    Returns False for an unknown action; raises HTTPException(400) when the order can't be filled.
+    """
     cost = trade.quantity * trade.price
+    hkey = holding_key(*_position(trade))
+    key = position_key(*_position(trade))
     
     if trade.action == "buy":
         if portfolio.balance >= cost:
             portfolio.balance -= cost
             
             # Check for existing holding
-            query = db.query(Holding).filter(
-                Holding.portfolio_id == portfolio.id, 
-                Holding.symbol == trade.symbol,
-                Holding.asset_type == trade.asset_type
-            )
-            
-            if trade.asset_type == "option":
-                query = query.filter(
-                    Holding.option_type == trade.option_type,
-                    Holding.strike == trade.strike,
-                    Holding.expiration == trade.expiration
-                )
-                
-            holding = query.first()
+            holding = book.holding(hkey)
             
             if holding:
                 # Calculate new avg price
@@ -184,7 +225,7 @@ def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
                 holding.quantity += trade.quantity
                 holding.avg_price = total_cost / holding.quantity
             else:
-                holding = Holding(
+                book.add_holding(hkey, Holding(
                     portfolio_id=portfolio.id, 
                     symbol=trade.symbol, 
                     quantity=trade.quantity, 
@@ -193,8 +234,9 @@ def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
                     option_type=trade.option_type,
                     strike=trade.strike,
                     expiration=trade.expiration
-                )
-                db.add(holding)
+                ))
+            
+            book.open_lot(key, trade.quantity, trade.price)
             
             # Record transaction
             txn = Transaction(
@@ -208,34 +250,21 @@ def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
                 expiration=trade.expiration
             )
             db.add(txn)
-            
-            db.commit()
-            return {"status": "success", "balance": portfolio.balance}
+            return True
         else:
             raise HTTPException(status_code=400, detail="Insufficient funds")
             
     elif trade.action == "sell":
-        query = db.query(Holding).filter(
-            Holding.portfolio_id == portfolio.id, 
-            Holding.symbol == trade.symbol,
-            Holding.asset_type == trade.asset_type
-        )
-        
-        if trade.asset_type == "option":
-            query = query.filter(
-                Holding.option_type == trade.option_type,
-                Holding.strike == trade.strike,
-                Holding.expiration == trade.expiration
-            )
-            
-        holding = query.first()
+        holding = book.holding(hkey)
         
         if holding and holding.quantity >= trade.quantity:
             portfolio.balance += cost
             holding.quantity -= trade.quantity
             
             if holding.quantity == 0:
-                db.delete(holding)
+                book.remove_holding(hkey)
+                
+            book.close_lots(key, trade.quantity, trade.price)
                 
             # Record transaction
             txn = Transaction(
@@ -249,13 +278,46 @@ def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
                 expiration=trade.expiration
             )
             db.add(txn)
-            
-            db.commit()
-            return {"status": "success", "balance": portfolio.balance}
+            return True
         else:
             raise HTTPException(status_code=400, detail="Insufficient holdings")
             
-    return {"status": "error", "msg": "Invalid action"}
+    return False
+
+@app.post("/api/trade")
+def execute_trade(trade: TradeRequest, db: Session = Depends(get_db)):
+    portfolio = get_or_create_portfolio(db)
+    book = PositionBook(db, portfolio.id, [_position(trade)])
+    
+    if not apply_trade(db, portfolio, trade, book):
+        return {"status": "error", "msg": "Invalid action"}
+    
+    db.commit()
+    return {"status": "success", "balance": portfolio.balance}
+
+class BatchTradeRequest(BaseModel):
+    orders: list[TradeRequest]
+
+@app.post("/api/trades/batch")
+def execute_trades_batch(req: BatchTradeRequest, db: Session = Depends(get_db)):
+    """
+    Apply all orders in one transaction: either every order fills or none do.
+    Holdings and lots for every symbol in the batch are loaded once and updated in memory.
+    """
+    portfolio = get_or_create_portfolio(db)
+    book = PositionBook(db, portfolio.id, [_position(t) for t in req.orders])
+    
+    for i, trade in enumerate(req.orders):
+        try:
+            if not apply_trade(db, portfolio, trade, book):
+                raise HTTPException(status_code=400, detail="Invalid action")
+        except HTTPException as e:
+            db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=f"Order {i} ({trade.action} {trade.symbol}): {e.detail}")
+    
+    db.commit()
+    return {"status": "success", "filled": len(req.orders), "balance": portfolio.balance}
+
 
 class ExerciseRequest(BaseModel):
     holding_id: int
@@ -301,6 +363,9 @@ def exercise_option(req: ExerciseRequest, db: Session = Depends(get_db)):
                 asset_type="stock"
             )
             db.add(new_stock)
+        
+        # Shares acquired at strike open a new lot
+        open_lot(db, portfolio.id, position_key(holding.symbol), shares_needed, strike)
             
     elif holding.option_type == "put":
         # Selling shares at strike
@@ -317,9 +382,14 @@ def exercise_option(req: ExerciseRequest, db: Session = Depends(get_db)):
         existing_stock.quantity -= shares_needed
         if existing_stock.quantity == 0:
             db.delete(existing_stock)
+        
+        # Shares delivered at strike close the oldest lots
+        close_lots(db, portfolio.id, position_key(holding.symbol), shares_needed, strike)
             
-    # Remove option holding
+    # Remove option holding and its lots
     db.delete(holding)
+    drop_lots(db, portfolio.id, position_key(holding.symbol, holding.asset_type, holding.option_type,
+                                             holding.strike, holding.expiration))
     
     # Record transaction (simplified)
     # db.add(Transaction(...)) 
@@ -354,41 +424,24 @@ def get_portfolio(db: Session = Depends(get_db)):
     detailed_holdings = []
     total_value = portfolio.balance
     
+    # Price every holding with one batched, cached quote lookup
+    quote_symbols = {}
+    for h in holdings:
+        if h.asset_type == "option":
+            # Construct OCC symbol for pricing
+            quote_symbols[h.id] = get_occ_symbol(h.symbol, h.expiration, h.option_type, h.strike)
+        else:
+            quote_symbols[h.id] = h.symbol
+    quotes = get_quotes([s for s in quote_symbols.values() if s])
+    
     for h in holdings:
-        current_price = 0.0
         display_name = h.symbol
         
-        try:
-            if h.asset_type == "option":
-                # Construct OCC symbol for pricing
-                occ_symbol = get_occ_symbol(h.symbol, h.expiration, h.option_type, h.strike)
-                if occ_symbol:
-                    ticker = yf.Ticker(occ_symbol)
-                    current_price = ticker.fast_info.last_price
-                    if not current_price or current_price == 0.0:
-                         # Try history
-                         hist = ticker.history(period="1d")
-                         if not hist.empty:
-                             current_price = hist['Close'].iloc[-1]
-                
-                # Fallback if fetch failed
-                if not current_price:
-                    current_price = h.avg_price
-                    
-                display_name = f"{h.symbol} {h.expiration} {h.strike} {h.option_type.title()}"
-            else:
-                # Stock
-                ticker = yf.Ticker(h.symbol)
-                current_price = ticker.fast_info.last_price
-                if not current_price:
-                     history = ticker.history(period="1d")
-                     if not history.empty:
-                         current_price = history['Close'].iloc[-1]
-                     else:
-                         current_price = h.avg_price
-        except Exception as e:
-            logging.error(f"Price fetch error for {h.symbol}: {e}")
-            current_price = h.avg_price
+        # Fallback to cost if the quote fetch failed
+        current_price = quotes.get(quote_symbols[h.id]) or h.avg_price
+        
+        if h.asset_type == "option":
+            display_name = f"{h.symbol} {h.expiration} {h.strike} {h.option_type.title()}"
             
         market_value = h.quantity * current_price
         # For options, quantity is contracts, but price is per share, so value is price * 100 * qty?
@@ -424,61 +477,24 @@ def get_portfolio(db: Session = Depends(get_db)):
         })
         
     # --- Performance Stats ---
-    transactions = db.query(Transaction).order_by(Transaction.timestamp).all()
-    
-    realized_pnl = 0.0
-    wins = 0
-    losses = 0
-    consecutive_losses = 0
-    max_consecutive_losses = 0
-    
-    # FIFO Matching for Realized P&L
-    # Map: symbol -> list of [quantity, price]
-    inventory = {} 
+    # Maintained incrementally by the lot ledger on every trade
+    stats = get_stats(db, portfolio.id)
+    realized_pnl = stats.realized_pnl
+    wins = stats.wins
+    losses = stats.losses
+    max_consecutive_losses = stats.max_consecutive_losses
     
-    for t in transactions:
-        sym = t.symbol
-        if t.asset_type == "option":
-            sym = f"{t.symbol}_{t.option_type}_{t.strike}_{t.expiration}"
-            
-        if t.action == "buy":
-            if sym not in inventory: inventory[sym] = []
-            inventory[sym].append([t.quantity, t.price])
-        elif t.action == "sell":
-            qty_to_sell = t.quantity
-            while qty_to_sell > 0 and sym in inventory and inventory[sym]:
-                # FIFO: Pop from front
-                buy_qty, buy_price = inventory[sym][0]
-                
-                matched_qty = min(qty_to_sell, buy_qty)
-                
-                # Calculate P&L for this chunk
-                pnl = (t.price - buy_price) * matched_qty
-                realized_pnl += pnl
-                
-                if pnl > 0:
-                    wins += 1
-                    consecutive_losses = 0
-                elif pnl < 0:
-                    losses += 1
-                    consecutive_losses += 1
-                    max_consecutive_losses = max(max_consecutive_losses, consecutive_losses)
-                
-                # Update inventory
-                if matched_qty == buy_qty:
-                    inventory[sym].pop(0) # Fully sold this lot
-                else:
-                    inventory[sym][0][0] -= matched_qty # Partially sold
-                    
-                qty_to_sell -= matched_qty
-
     total_trades = wins + losses
     win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
     
     # --- Risk Metrics ---
+    from .metadata_service import get_sectors
     sector_exposure = {}
     asset_allocation = {"Stock": 0.0, "Option": 0.0, "Cash": portfolio.balance}
     
+    # Sectors come from the metadata store in one query; unknown symbols are fetched in the background
+    sectors = get_sectors([h['symbol'] for h in detailed_holdings if h['asset_type'] == "stock"])
+    
     for h in detailed_holdings:
         # Asset Allocation
         if h['asset_type'] == "option":
@@ -488,17 +504,12 @@ def get_portfolio(db: Session = Depends(get_db)):
             
         # Sector Exposure (Stocks only for now)
         if h['asset_type'] == "stock":
-            try:
-                # We might need to cache this to avoid slow API calls
-                # For now, let's try to get it from info if available, or just use symbol
-                # Ideally we'd store sector in DB or fetch in batch.
-                # To keep it fast, let's assume we can get it from yfinance quickly or skip
-                # Using fast_info doesn't give sector. 
-                # Let's skip live sector fetch for speed and just group by symbol for now
-                # Or try to fetch from yfinance info but catch errors
-                pass 
-            except:
-                pass
+            sector = sectors.get(h['symbol']) or "Unknown"
+            sector_exposure[sector] = sector_exposure.get(sector, 0.0) + h['market_value']
+
+    # Sector exposure as % of stock value
+    stock_value = asset_allocation["Stock"]
+    sector_exposure_pct = {k: (v / stock_value * 100) if stock_value > 0 else 0 for k, v in sector_exposure.items()}
 
     # Normalize Allocation
     total_assets = asset_allocation["Stock"] + asset_allocation["Option"] + asset_allocation["Cash"]
@@ -515,7 +526,8 @@ def get_portfolio(db: Session = Depends(get_db)):
             "max_consecutive_losses": max_consecutive_losses
         },
         "risk": {
-            "allocation": allocation_pct
+            "allocation": allocation_pct,
+            "sector_exposure": sector_exposure_pct
         }
     }
 
@@ -534,73 +546,138 @@ def update_watchlist(req: WatchlistRequest, db: Session = Depends(get_db)):
     db.commit()
     return {"status": "success"}
 
+def _stream_symbols(symbols: str = None):
+    """Symbols from a comma-separated query param, defaulting to the saved watchlist."""
+    if symbols:
+        return [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    db = SessionLocal()
+    try:
+        return [item.symbol for item in db.query(Watchlist).all()]
+    finally:
+        db.close()
+
+@app.websocket("/ws/watchlist")
+async def watchlist_socket(websocket: WebSocket, symbols: str = None):
+    """
+    Push {symbol: price} messages whenever a watched price changes.
+    Clients may send {"symbols": [...]} to change their subscription.
+    """
+    from .watchlist_stream import hub
+    
+    await websocket.accept()
+    sub_id, sub = hub.subscribe(await run_blocking(_stream_symbols, symbols))
+    
+    async def receive_updates():
+        try:
+            while True:
+                try:
+                    msg = json.loads(await websocket.receive_text())
+                except ValueError:
+                    continue # Ignore malformed messages; keep the current subscription
+                if isinstance(msg, dict) and isinstance(msg.get("symbols"), list):
+                    hub.update_symbols(sub_id, [str(s).upper() for s in msg["symbols"]])
+        except WebSocketDisconnect:
+            pass
+    
+    receiver = asyncio.create_task(receive_updates())
+    try:
+        while not receiver.done():
+            update = await sub.next_update(timeout=1.0)
+            if update:
+                await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        hub.unsubscribe(sub_id)
+
+@app.get("/api/watchlist/stream")
+async def watchlist_events(request: Request, symbols: str = None):
+    """Server-Sent Events variant of /ws/watchlist."""
+    from .watchlist_stream import hub
+    
+    sub_id, sub = hub.subscribe(await run_blocking(_stream_symbols, symbols))
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                update = await sub.next_update(timeout=15.0)
+                # Comment line as keep-alive when nothing changed
+                yield f"data: {json.dumps(update)}\n\n" if update else ": ping\n\n"
+        finally:
+            hub.unsubscribe(sub_id)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/api/entropy")
-def get_entropy_analysis(start_date: str = None, end_date: str = None):
+async def get_entropy_analysis(start_date: str = None, end_date: str = None, windows: str = None):
+    return await singleflight(("entropy", start_date, end_date, windows), _get_entropy_analysis, start_date, end_date, windows)
+
+def _parse_windows(windows: str):
+    """e.g. "10,20,60" -> [10, 20, 60]; HTTP 400 on anything but integers >= 2."""
     try:
-        from .entropy_service import compute_market_entropy
+        window_list = [int(w) for w in windows.split(",") if w.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"windows must be comma-separated integers, got {windows!r}")
+    if not window_list or min(window_list) < 2:
+        raise HTTPException(status_code=400, detail="windows must be at least 2 days each")
+    return window_list
+
+def _get_entropy_analysis(start_date: str = None, end_date: str = None, windows: str = None):
+    window_list = _parse_windows(windows) if windows else None
+    try:
+        from .entropy_service import compute_market_entropy, compute_multi_window_entropy
+        if window_list:
+            # e.g. windows=10,20,60 -> {"windows": {"10": {...}, "20": {...}, "60": {...}}}
+            return compute_multi_window_entropy(window_list, start_date=start_date, end_date=end_date)
         data = compute_market_entropy(start_date=start_date, end_date=end_date)
         return data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Entropy Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/options/{symbol}")
-def get_options_chain(symbol: str, date: str = None):
+async def get_options_chain(symbol: str, date: str = None):
+    return await singleflight(("options", symbol, date), _get_options_chain, symbol, date)
+
+def _get_options_chain(symbol: str, date: str = None):
     try:
-        from .greeks import calculate_greeks
+        from .greeks import calculate_greeks_array
+        from .options_service import get_chain_snapshot, years_to_expiry, RISK_FREE_RATE
         
-        ticker = yf.Ticker(symbol)
-        expirations = ticker.options
+        # All expirations are cached together, so switching dates doesn't re-download
+        snapshot = get_chain_snapshot(symbol)
+        expirations = snapshot["expirations"]
         
         if not expirations:
             return {"symbol": symbol, "expirations": [], "calls": [], "puts": []}
             
         target_date = date if date in expirations else expirations[0]
         
-        # Get current stock price
-        current_price = ticker.history(period="1d")['Close'].iloc[-1]
+        current_price = snapshot["current_price"]
+        r = RISK_FREE_RATE
         
-        # Risk free rate (approx 4.5%)
-        r = 0.045
-        
-        # Calculate time to expiration in years
         # Calculate time to expiration in years
-        from datetime import datetime, timedelta
-        exp_dt = datetime.strptime(target_date, "%Y-%m-%d")
-        # Set expiration to market close (16:00)
-        exp_dt = exp_dt.replace(hour=16, minute=0, second=0)
-        
-        today = datetime.now()
-        
-        # Calculate difference in years
-        diff = exp_dt - today
-        T = diff.total_seconds() / (365 * 24 * 3600)
-        
-        if T < 0.0001: T = 0.0001 # Avoid zero division for expired/expiring
-        
-        opt = ticker.option_chain(target_date)
-        
-        # Process Calls
-        calls = []
-        for _, row in opt.calls.fillna(0).iterrows():
-            d = row.to_dict()
-            # Calculate Greeks
-            iv = d.get('impliedVolatility', 0)
-            if iv > 0:
-                greeks = calculate_greeks(current_price, d['strike'], T, r, iv, "call")
-                d.update(greeks)
-            calls.append(d)
-
-        # Process Puts
-        puts = []
-        for _, row in opt.puts.fillna(0).iterrows():
-            d = row.to_dict()
-            # Calculate Greeks
-            iv = d.get('impliedVolatility', 0)
-            if iv > 0:
-                greeks = calculate_greeks(current_price, d['strike'], T, r, iv, "put")
-                d.update(greeks)
-            puts.append(d)
+        T = float(years_to_expiry([target_date])[0])
+        
+        calls_df, puts_df = snapshot["chains"][target_date]
+        
+        # Greeks for calls and puts in a single vectorized pass
+        chain = pd.concat([calls_df, puts_df], ignore_index=True).fillna(0)
+        n_calls = len(calls_df)
+        is_call = np.arange(len(chain)) < n_calls
+        iv = chain['impliedVolatility'].to_numpy(dtype=float) if 'impliedVolatility' in chain else np.zeros(len(chain))
+        
+        greeks = calculate_greeks_array(float(current_price), chain['strike'].to_numpy(dtype=float), T, r, iv, is_call)
+        for name, values in greeks.items():
+            # Contracts without IV get null Greeks
+            chain[name] = pd.Series(values, index=chain.index).astype(object).where(iv > 0, None)
+        
+        records = chain.to_dict(orient='records')
+        calls = records[:n_calls]
+        puts = records[n_calls:]
         
         return {
             "symbol": symbol,
@@ -614,24 +691,67 @@ def get_options_chain(symbol: str, date: str = None):
         logging.error(f"Options Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/options/{symbol}/surface")
+async def get_iv_surface(symbol: str, points: int = 41, min_moneyness: float = 0.7, max_moneyness: float = 1.3):
+    return await singleflight(("iv-surface", symbol, points, min_moneyness, max_moneyness),
+                              _get_iv_surface, symbol, points, min_moneyness, max_moneyness)
+
+def _get_iv_surface(symbol: str, points: int = 41, min_moneyness: float = 0.7, max_moneyness: float = 1.3):
+    try:
+        from .options_service import iv_surface
+        return iv_surface(symbol, n_points=points, min_moneyness=min_moneyness, max_moneyness=max_moneyness)
+    except Exception as e:
+        logging.error(f"IV Surface Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 class BacktestRequest(BaseModel):
     symbol: str
     strategy: str = "sma_cross"
     params: dict = {"fast": 50, "slow": 200}
     initial_capital: float = 100000.0
+    format: str = "records"  # "records" or "columnar" equity curve
 
 @app.post("/api/backtest")
-def run_backtest_endpoint(req: BacktestRequest):
+async def run_backtest_endpoint(req: BacktestRequest, request: Request):
+    columnar = wants_columnar(request, req.format)
+    payload = await singleflight(("backtest", req.model_dump_json(), columnar), _run_backtest_endpoint, req, columnar)
+    return encode_response(request, payload, table_key="equity_curve")
+
+def _run_backtest_endpoint(req: BacktestRequest, columnar: bool = False):
     try:
         from .backtester_service import run_backtest
-        result = run_backtest(req.symbol, req.strategy, req.params, req.initial_capital)
+        result = run_backtest(req.symbol, req.strategy, req.params, req.initial_capital, columnar=columnar)
         return result
     except Exception as e:
         logging.error(f"Backtest Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class SweepRequest(BaseModel):
+    symbol: str
+    strategy: str = "sma_cross"
+    # Each axis is a list of values or {"start": .., "stop": .., "step": ..} (stop inclusive)
+    grid: dict = {"fast": {"start": 5, "stop": 100, "step": 5}, "slow": {"start": 50, "stop": 300, "step": 10}}
+    initial_capital: float = 100000.0
+
+@app.post("/api/backtest/sweep")
+async def run_sweep_endpoint(req: SweepRequest):
+    return await singleflight(("sweep", req.model_dump_json()), _run_sweep_endpoint, req)
+
+def _run_sweep_endpoint(req: SweepRequest):
+    try:
+        from .sweep_service import run_sweep
+        return run_sweep(req.symbol, req.strategy, req.grid, req.initial_capital)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Sweep Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/sentiment/{symbol}")
-def get_sentiment(symbol: str):
+async def get_sentiment(symbol: str):
+    return await singleflight(("sentiment", symbol), _get_sentiment, symbol)
+
+def _get_sentiment(symbol: str):
     try:
         from .sentiment_service import fetch_news
         news = fetch_news(symbol)
@@ -655,8 +775,70 @@ def get_sentiment(symbol: str):
         logging.error(f"Sentiment Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/regime")
+async def get_regime_snapshot_endpoint():
+    return await singleflight(("regime",), _get_regime_snapshot_endpoint)
+
+def _get_regime_snapshot_endpoint():
+    try:
+        from .recommendation_service import get_regime_snapshot
+        return get_regime_snapshot()
+    except Exception as e:
+        logging.error(f"Regime Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/regime/refresh")
+async def refresh_regime_snapshot_endpoint():
+    return await singleflight(("regime-refresh",), _refresh_regime_snapshot_endpoint)
+
+def _refresh_regime_snapshot_endpoint():
+    try:
+        from .recommendation_service import refresh_regime_snapshot
+        return refresh_regime_snapshot()
+    except Exception as e:
+        logging.error(f"Regime Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class RegimeForecastRequest(BaseModel):
+    model: str = "lstm"  # "lstm" or "transformer"
+    # Feature windows, [N][T][input_dim], in the column order the model was trained on
+    windows: list[list[list[float]]]
+    attention: bool = False  # transformer only: include head-averaged attention maps
+
+@app.post("/api/regime/forecast")
+async def regime_forecast_endpoint(req: RegimeForecastRequest):
+    try:
+        from .regime_model_service import forecast
+        probs, attn, entry = await forecast(req.model, req.windows, attention=req.attention)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Regime Forecast Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    predicted = probs.argmax(axis=1)
+    results = []
+    for i in range(len(probs)):
+        row = {
+            "predicted_regime": int(predicted[i]),
+            "transition_probabilities": probs[i].tolist()
+        }
+        if attn is not None:
+            row["attention"] = attn[i].tolist()
+        results.append(row)
+
+    return {
+        "model": req.model,
+        "regimes": list(range(entry["num_classes"])),
+        "feature_cols": entry["feature_cols"],
+        "forecasts": results
+    }
+
 @app.get("/api/recommendation/{symbol}")
-def get_recommendation_endpoint(symbol: str):
+async def get_recommendation_endpoint(symbol: str):
+    return await singleflight(("recommendation", symbol), _get_recommendation_endpoint, symbol)
+
+def _get_recommendation_endpoint(symbol: str):
     try:
         from .recommendation_service import get_recommendation
         result = get_recommendation(symbol)
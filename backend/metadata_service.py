@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import yfinance as yf
+from .database import SessionLocal, TickerMetadata
+from .metrics import timed
+
+# ticker.info is the slowest yfinance call and its fields change at most daily
+METADATA_TTL = timedelta(hours=float(os.environ.get("METADATA_TTL_HOURS", 24)))
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _store(symbol, info):
+    db = SessionLocal()
+    try:
+        row = db.get(TickerMetadata, symbol)
+        if row is None:
+            row = TickerMetadata(symbol=symbol)
+            db.add(row)
+        row.sector = info.get("sector")
+        row.info_json = json.dumps(info, default=str)
+        row.fetched_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+def refresh_metadata(symbol):
+    """Fetch ticker.info from yfinance and persist it."""
+    with timed("yfinance", "info"):
+        info = yf.Ticker(symbol).info or {}
+    _store(symbol, info)
+    return info
+
+def _refresh_in_background(symbol):
+    with _refreshing_lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+
+    def run():
+        try:
+            refresh_metadata(symbol)
+        except Exception as e:
+            logging.error(f"Metadata refresh failed for {symbol}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(symbol)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def get_metadata(symbol: str):
+    """
+    ticker.info for `symbol` from the database. Only a first-time lookup waits
+    on the network; stale entries are served while a background refresh runs.
+    """
+    db = SessionLocal()
+    try:
+        row = db.get(TickerMetadata, symbol)
+        cached = (json.loads(row.info_json), row.fetched_at) if row else None
+    finally:
+        db.close()
+
+    if cached is None:
+        return refresh_metadata(symbol)
+
+    info, fetched_at = cached
+    if datetime.utcnow() - fetched_at > METADATA_TTL:
+        _refresh_in_background(symbol)
+    return info
+
+def get_sectors(symbols):
+    """
+    {symbol: sector} from the database in one query, never blocking on the network.
+    Unknown or stale symbols are fetched in the background for later calls.
+    """
+    symbols = list(set(symbols))
+    if not symbols:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = db.query(TickerMetadata.symbol, TickerMetadata.sector, TickerMetadata.fetched_at) \
+                 .filter(TickerMetadata.symbol.in_(symbols)).all()
+    finally:
+        db.close()
+
+    sectors = {}
+    now = datetime.utcnow()
+    for symbol, sector, fetched_at in rows:
+        sectors[symbol] = sector
+        if now - fetched_at > METADATA_TTL:
+            _refresh_in_background(symbol)
+    for symbol in symbols:
+        if symbol not in sectors:
+            _refresh_in_background(symbol)
+    return sectors
@@ -0,0 +1,91 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Prometheus' default latency buckets (seconds), extended for slow upstream calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labelvalues):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labelvalues, series in sorted(snapshot.items()):
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for le, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                            ("method", "route", "status"))
+DEPENDENCY_LATENCY = Histogram("dependency_duration_seconds",
+                               "Time spent in upstream calls, database queries and heavy compute.",
+                               ("dependency", "operation"))
+
+# Per-request {dependency: seconds}, summed into the Server-Timing header. Work on the
+# upstream executor inherits it (see singleflight.run_blocking); background threads don't.
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def start_request():
+    """Begin collecting dependency timings for the current request; returns the dict that fills up."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def record(dependency, operation, seconds):
+    DEPENDENCY_LATENCY.observe(seconds, dependency, operation)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[dependency] = timings.get(dependency, 0.0) + seconds
+
+@contextmanager
+def timed(dependency, operation):
+    """Time a block (or, as a decorator, a function) as `dependency`/`operation`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(dependency, operation, time.perf_counter() - start)
+
+def server_timing(timings, total):
+    """Server-Timing header value: total plus one entry per dependency, in milliseconds."""
+    entries = [f"total;dur={total * 1000:.1f}"]
+    entries += [f"{dep};dur={seconds * 1000:.1f}" for dep, seconds in sorted(timings.items())]
+    return ", ".join(entries)
+
+def render():
+    """Every metric in Prometheus text exposition format."""
+    return "\n".join(REQUEST_LATENCY.render() + DEPENDENCY_LATENCY.render()) + "\n"
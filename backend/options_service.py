@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from .metrics import timed
+
+# Full option-chain snapshots (every expiration) are cached per symbol for this long
+OPTIONS_TTL_SECONDS = float(os.environ.get("OPTIONS_TTL_SECONDS", 60))
+OPTIONS_MAX_WORKERS = int(os.environ.get("OPTIONS_MAX_WORKERS", 8))
+
+# Risk free rate (approx 4.5%)
+RISK_FREE_RATE = 0.045
+
+# Avoid zero division for expired/expiring contracts
+MIN_T = 0.0001
+
+_snapshots = {}  # symbol -> snapshot dict
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _symbol_lock(symbol):
+    with _locks_guard:
+        if symbol not in _locks:
+            _locks[symbol] = threading.Lock()
+        return _locks[symbol]
+
+def years_to_expiry(expirations, now=None):
+    """Time to expiration in years for YYYY-MM-DD dates, with expiry at market close (16:00)."""
+    now = now or datetime.now()
+    exp = pd.to_datetime(pd.Series(expirations), format="%Y-%m-%d") + pd.Timedelta(hours=16)
+    T = (exp - pd.Timestamp(now)).dt.total_seconds().to_numpy() / (365 * 24 * 3600)
+    return np.maximum(T, MIN_T)
+
+def _fetch_snapshot(symbol):
+    ticker = yf.Ticker(symbol)
+    expirations = list(ticker.options)
+
+    # Get current stock price
+    current_price = float(ticker.history(period="1d")['Close'].iloc[-1]) if expirations else None
+
+    def fetch_chain(date):
+        opt = ticker.option_chain(date)
+        return opt.calls, opt.puts
+
+    chains = {}
+    if expirations:
+        # Prefetch every expiration in parallel
+        with ThreadPoolExecutor(max_workers=min(OPTIONS_MAX_WORKERS, len(expirations))) as pool:
+            for date, chain in zip(expirations, pool.map(fetch_chain, expirations)):
+                chains[date] = chain
+
+    return {
+        "symbol": symbol,
+        "expirations": expirations,
+        "current_price": current_price,
+        "chains": chains,
+        "fetched_at": time.monotonic()
+    }
+
+def get_chain_snapshot(symbol: str):
+    """All expirations for `symbol`, cached for OPTIONS_TTL_SECONDS. The frames are shared; don't mutate them."""
+    snapshot = _snapshots.get(symbol)
+    if snapshot and time.monotonic() - snapshot["fetched_at"] < OPTIONS_TTL_SECONDS:
+        return snapshot
+    with _symbol_lock(symbol):
+        snapshot = _snapshots.get(symbol)
+        if snapshot and time.monotonic() - snapshot["fetched_at"] < OPTIONS_TTL_SECONDS:
+            return snapshot
+        with timed("yfinance", "option_chain"):
+            snapshot = _fetch_snapshot(symbol)
+        _snapshots[symbol] = snapshot
+        logging.info(f"Cached {len(snapshot['expirations'])} option expirations for {symbol}")
+        return snapshot
+
+def iv_surface(symbol: str, n_points: int = 41, min_moneyness: float = 0.7, max_moneyness: float = 1.3):
+    """
+    Implied-volatility surface on a moneyness (K/S) x maturity grid.
+
+    Out-of-the-money contracts are used (puts below spot, calls at/above),
+    and each expiration's smile is linearly interpolated onto the moneyness
+    grid. Points outside an expiration's quoted strikes are null.
+    """
+    snapshot = get_chain_snapshot(symbol)
+    S = snapshot["current_price"]
+    moneyness = np.linspace(min_moneyness, max_moneyness, n_points)
+
+    expirations = []
+    rows = []
+    for date in snapshot["expirations"]:
+        calls, puts = snapshot["chains"][date]
+        strikes = np.concatenate([calls['strike'].to_numpy(dtype=float), puts['strike'].to_numpy(dtype=float)])
+        iv = np.concatenate([calls['impliedVolatility'].to_numpy(dtype=float), puts['impliedVolatility'].to_numpy(dtype=float)])
+        is_call = np.arange(len(strikes)) < len(calls)
+
+        m = strikes / S
+        keep = (iv > 0) & np.isfinite(iv) & np.where(is_call, m >= 1.0, m < 1.0)
+        if keep.sum() < 2:
+            continue
+
+        order = np.argsort(m[keep])
+        m_k, iv_k = m[keep][order], iv[keep][order]
+        row = np.interp(moneyness, m_k, iv_k, left=np.nan, right=np.nan)
+        expirations.append(date)
+        rows.append(row)
+
+    surface = np.vstack(rows) if rows else np.empty((0, n_points))
+    maturities = years_to_expiry(expirations) if expirations else np.array([])
+
+    return {
+        "symbol": symbol,
+        "current_price": S,
+        "moneyness": moneyness.tolist(),
+        "strikes": (moneyness * S).tolist() if S else [],
+        "expirations": expirations,
+        "maturities": maturities.tolist(),
+        "iv": [[None if np.isnan(v) else v for v in row] for row in surface.tolist()]
+    }
@@ -0,0 +1,111 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+from .metrics import timed
+
+# Quotes younger than this are served from the shared cache
+QUOTE_TTL_SECONDS = float(os.environ.get("QUOTE_TTL_SECONDS", 15))
+QUOTE_MAX_WORKERS = int(os.environ.get("QUOTE_MAX_WORKERS", 16))
+
+
+class QuoteProvider:
+    """Source of last prices. Implementations return {symbol: price} for the symbols they could price."""
+
+    def get_quotes(self, symbols):
+        raise NotImplementedError
+
+
+class YFinanceQuoteProvider(QuoteProvider):
+    """Fetches last prices from yfinance, one symbol per worker thread."""
+
+    def __init__(self, max_workers=QUOTE_MAX_WORKERS):
+        self.max_workers = max_workers
+
+    def _last_price(self, symbol):
+        try:
+            ticker = yf.Ticker(symbol)
+            price = ticker.fast_info.last_price
+            if not price:
+                # Try history
+                hist = ticker.history(period="1d")
+                if not hist.empty:
+                    price = hist['Close'].iloc[-1]
+            return float(price) if price else None
+        except Exception as e:
+            logging.error(f"Price fetch error for {symbol}: {e}")
+            return None
+
+    def get_quotes(self, symbols):
+        if not symbols:
+            return {}
+        workers = min(self.max_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            prices = pool.map(self._last_price, symbols)
+        return {s: p for s, p in zip(symbols, prices) if p}
+
+
+class StaticQuoteProvider(QuoteProvider):
+    """Serves fixed prices from a dict; a local stand-in for tests and offline runs."""
+
+    def __init__(self, prices=None):
+        self.prices = dict(prices or {})
+
+    def get_quotes(self, symbols):
+        return {s: self.prices[s] for s in symbols if s in self.prices}
+
+
+class QuoteCache:
+    """Short-TTL quote cache shared across requests; misses go to the provider in one batch."""
+
+    def __init__(self, provider, ttl=QUOTE_TTL_SECONDS):
+        self.provider = provider
+        self.ttl = ttl
+        self._quotes = {}  # symbol -> (price, fetched_at)
+        self._lock = threading.Lock()
+
+    def get_quotes(self, symbols, max_age=None):
+        symbols = list(dict.fromkeys(symbols))
+        max_age = self.ttl if max_age is None else max_age
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with self._lock:
+            for s in symbols:
+                cached = self._quotes.get(s)
+                if cached and now - cached[1] < max_age:
+                    result[s] = cached[0]
+                else:
+                    missing.append(s)
+
+        if missing:
+            # Timed as a whole: the provider's worker threads don't carry the request context
+            with timed("yfinance", "quotes"):
+                fetched = self.provider.get_quotes(missing)
+            fetched_at = time.monotonic()
+            with self._lock:
+                for s, price in fetched.items():
+                    self._quotes[s] = (price, fetched_at)
+            result.update(fetched)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+
+_cache = QuoteCache(YFinanceQuoteProvider())
+
+def set_provider(provider):
+    """Swap the quote source (e.g. StaticQuoteProvider in tests); clears cached quotes."""
+    global _cache
+    _cache = QuoteCache(provider, ttl=_cache.ttl)
+
+def get_quotes(symbols, max_age=None):
+    """
+    Last prices for `symbols` (stock tickers or OCC option symbols). Unpriced symbols are omitted.
+    `max_age` (seconds) overrides the cache TTL for callers that need fresher prices.
+    """
+    return _cache.get_quotes(symbols, max_age=max_age)
@@ -1,34 +1,89 @@
+import os
+import time
 import logging
+import threading
+from datetime import datetime
 from .entropy_service import compute_market_entropy
-from .sentiment_service import fetch_news
+from .sentiment_service import get_sentiment_summary
 from .backtester_service import run_backtest
 import yfinance as yf
 
+# The market regime is the same for every symbol, so it is computed once and shared.
+# A snapshot is refreshed when the date changes or it is older than the TTL.
+REGIME_SNAPSHOT_TTL_SECONDS = float(os.environ.get("REGIME_SNAPSHOT_TTL_SECONDS", 3600))
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+def _compute_regime_snapshot():
+    entropy_data = compute_market_entropy()
+    
+    # FIX: Check structure of entropy_data.
+    # Debug output shows: {'current_state': ..., 'current_entropy': ..., 'data': [{'Date': ..., 'Entropy': 2.22, ...}]}
+    if isinstance(entropy_data, dict) and entropy_data.get('data'):
+        latest = entropy_data['data'][-1]
+    elif isinstance(entropy_data, list) and len(entropy_data) > 0:
+        latest = entropy_data[-1]
+    else:
+        # Fallback if empty
+        latest = {'Entropy': 3.5, 'Regime': 'Unknown'}
+    
+    # Use 'Entropy' key from debug output, fallback to 'value' just in case of older format
+    return {
+        "entropy": latest.get('Entropy', latest.get('value', 3.5)),
+        "regime": latest.get('Regime', latest.get('regime', 'Unknown')),
+        "as_of": latest.get('Date'),
+        "computed_at": time.time(),
+        "session": datetime.now().date().isoformat()
+    }
+
+def refresh_regime_snapshot():
+    """Recompute the shared regime snapshot now (on demand or from the background refresher)."""
+    global _snapshot
+    _snapshot = _compute_regime_snapshot()
+    return _snapshot
+
+def _refresh_in_background():
+    try:
+        refresh_regime_snapshot()
+    except Exception as e:
+        logging.error(f"Regime snapshot refresh failed: {e}")
+    finally:
+        _refresh_lock.release()
+
+def _is_stale(snapshot):
+    return (snapshot["session"] != datetime.now().date().isoformat()
+            or time.time() - snapshot["computed_at"] > REGIME_SNAPSHOT_TTL_SECONDS)
+
+def get_regime_snapshot():
+    """
+    Shared market regime for all symbols. The first call computes it; afterwards
+    a stale snapshot is served while a single background refresh runs.
+    """
+    if _snapshot is None:
+        with _snapshot_lock:
+            # Concurrent first callers wait for a single computation
+            if _snapshot is None:
+                refresh_regime_snapshot()
+    snapshot = _snapshot
+    if _is_stale(snapshot) and _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return snapshot
+
 def get_recommendation(symbol: str):
     try:
         # 1. Get Entropy (Market Regime)
-        # We use SPY as the proxy for market regime
-        entropy_data = compute_market_entropy()
-        
-        # FIX: Check structure of entropy_data.
-        # Debug output shows: {'current_state': ..., 'current_entropy': ..., 'data': [{'Date': ..., 'Entropy': 2.22, ...}]}
-        if isinstance(entropy_data, dict) and 'data' in entropy_data:
-            latest = entropy_data['data'][-1]
-        elif isinstance(entropy_data, list) and len(entropy_data) > 0:
-            latest = entropy_data[-1]
-        else:
-            # Fallback if empty
-            latest = {'Entropy': 3.5, 'Regime': 'Unknown'}
-
-        # Use 'Entropy' key from debug output, fallback to 'value' just in case of older format
-        current_entropy = latest.get('Entropy', latest.get('value', 3.5))
-        regime = latest.get('Regime', latest.get('regime', 'Unknown'))
+        # Shared snapshot of the sector-ETF regime, computed once per session
+        snapshot = get_regime_snapshot()
+        current_entropy = snapshot["entropy"]
+        regime = snapshot["regime"]
         
         # 2. Get Sentiment
-        news = fetch_news(symbol)
+        sentiment = get_sentiment_summary(symbol)
         avg_sentiment = 0.5 # Default neutral
-        if news:
-            avg_sentiment = sum(n['sentiment_score'] for n in news) / len(news)
+        if sentiment["count"]:
+            avg_sentiment = sentiment["average_score"]
             
         # 3. Bayesian Estimation for Signal
         # Hypotheses: Bullish, Bearish, Neutral
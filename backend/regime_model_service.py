@@ -0,0 +1,194 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+from .engine.src.lstm_model import RegimeLSTM
+from .engine.src.transformer_model import TransformerClassifier
+from .singleflight import run_blocking
+from .metrics import timed
+
+# Trained checkpoints live here as {model}.pt: a dict with the model's constructor
+# "config", its "state_dict" and optionally "window_size" and "feature_cols".
+# Defaults to <repo>/regime_models, where src.train writes, whatever the working directory.
+REGIME_MODEL_DIR = os.environ.get(
+    "REGIME_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "regime_models"))
+
+# Concurrent requests are merged into one forward pass of up to this many windows,
+# waiting at most this long for company after the first request arrives
+REGIME_MAX_BATCH = int(os.environ.get("REGIME_MAX_BATCH", 256))
+REGIME_BATCH_WAIT_MS = float(os.environ.get("REGIME_BATCH_WAIT_MS", 2))
+
+# Intra-op threads for the forward pass; inference runs on one dedicated thread
+# so torch's own pool is the only parallelism and cores aren't oversubscribed
+REGIME_INFER_THREADS = int(os.environ.get("REGIME_INFER_THREADS", min(4, os.cpu_count() or 1)))
+
+MODEL_CLASSES = {
+    "lstm": RegimeLSTM,
+    "transformer": TransformerClassifier,
+}
+
+_models = {}  # (name, attention) -> loaded model entry
+_models_lock = threading.Lock()
+_infer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="regime-infer")
+
+
+def checkpoint_path(name):
+    return os.path.join(REGIME_MODEL_DIR, f"{name}.pt")
+
+def build_model(name, config=None):
+    if name not in MODEL_CLASSES:
+        raise ValueError(f"Unknown regime model '{name}' (expected one of {sorted(MODEL_CLASSES)})")
+    return MODEL_CLASSES[name](**(config or {}))
+
+class _WithAttention(torch.nn.Module):
+    """Traceable wrapper returning (logits, attention) from the transformer."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x, return_attention=True)
+
+def _compile(model, name, attention, input_dim, seq_len):
+    """Trace and freeze for CPU; falls back to the eager module if tracing isn't possible."""
+    module = _WithAttention(model).eval() if attention else model
+    example = torch.zeros(2, seq_len, input_dim)
+    try:
+        with torch.no_grad():
+            return torch.jit.freeze(torch.jit.trace(module, example, check_trace=False))
+    except Exception as e:
+        logging.warning(f"Could not trace regime model '{name}', serving eager: {e}")
+        return module
+
+def load_model(name, attention=False):
+    """Load `name`'s checkpoint once and keep the compiled module for every later request."""
+    key = (name, attention)
+    entry = _models.get(key)
+    if entry is not None:
+        return entry
+    with _models_lock:
+        entry = _models.get(key)
+        if entry is not None:
+            return entry
+
+        # Validate the name before it is used to build a checkpoint path
+        if name not in MODEL_CLASSES:
+            raise ValueError(f"Unknown regime model '{name}' (expected one of {sorted(MODEL_CLASSES)})")
+        if attention and name != "transformer":
+            raise ValueError("Attention maps are only available for the transformer model")
+        path = checkpoint_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No checkpoint for regime model '{name}' at {path}")
+
+        torch.set_num_threads(REGIME_INFER_THREADS)
+        checkpoint = torch.load(path, map_location="cpu")
+        config = checkpoint.get("config", {})
+        model = build_model(name, config)
+        model.load_state_dict(checkpoint["state_dict"])
+        model.eval()
+
+        input_dim = config.get("input_dim", 7)
+        seq_len = checkpoint.get("window_size", config.get("seq_len", 20))
+        entry = {
+            "name": name,
+            "forward": _compile(model, name, attention, input_dim, seq_len),
+            "input_dim": input_dim,
+            "window_size": seq_len,
+            "num_classes": model.fc.out_features,
+            "feature_cols": checkpoint.get("feature_cols"),
+        }
+        _models[key] = entry
+        logging.info(f"Loaded regime model '{name}' from {path}")
+        return entry
+
+def _forward(entry, windows, attention):
+    with torch.inference_mode():
+        out = entry["forward"](torch.from_numpy(windows))
+        logits, attn = out if attention else (out, None)
+        probs = torch.softmax(logits, dim=-1).numpy()
+    return probs, (attn.numpy() if attn is not None else None)
+
+
+class MicroBatcher:
+    """
+    Collects windows from concurrent requests for one (model, attention, window length)
+    and runs them through a single forward pass.
+    """
+
+    def __init__(self, entry, attention, max_batch=REGIME_MAX_BATCH, wait_ms=REGIME_BATCH_WAIT_MS):
+        self.entry = entry
+        self.attention = attention
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    async def submit(self, windows):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((windows, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._queue.empty():
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            windows = np.concatenate([w for w, _ in batch])
+            try:
+                probs, attn = await loop.run_in_executor(_infer_executor, _forward, self.entry, windows, self.attention)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            # Hand each request back its own slice of the batch
+            offset = 0
+            for w, future in batch:
+                n = len(w)
+                if not future.done():
+                    future.set_result((probs[offset:offset + n], attn[offset:offset + n] if attn is not None else None))
+                offset += n
+
+
+_batchers = {}
+
+async def forecast(name, windows, attention=False):
+    """
+    Next-regime probabilities for feature windows of shape (N, T, input_dim).
+    Concurrent calls share forward passes. Returns (probs (N, classes), attention (N, T, T) or None, entry).
+    """
+    entry = await run_blocking(load_model, name, attention)
+
+    windows = np.ascontiguousarray(windows, dtype=np.float32)
+    if windows.ndim != 3 or windows.shape[2] != entry["input_dim"] or windows.shape[1] == 0:
+        raise ValueError(f"Expected windows shaped (N, T, {entry['input_dim']}), got {windows.shape}")
+
+    key = (name, attention, windows.shape[1])
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = MicroBatcher(entry, attention)
+
+    # Includes the wait for the micro-batch: the latency this request actually saw
+    with timed("torch", f"{name}_forecast"):
+        probs, attn = await batcher.submit(windows)
+    return probs, attn, entry
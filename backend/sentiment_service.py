@@ -2,7 +2,15 @@ import yfinance as yf
 import torch
 import torch.nn as nn
 import logging
+import os
 import re
+import threading
+import zlib
+import hashlib
+from datetime import datetime
+from .database import SessionLocal, ScoredArticle, NewsWatermark
+from .lexicon import LexiconScorer
+from .metrics import timed
 
 # Simple LSTM Model Definition
 class SentimentLSTM(nn.Module):
@@ -37,10 +45,71 @@ class SentimentLSTM(nn.Module):
                   weight.new(self.n_layers, batch_size, self.hidden_dim).zero_())
         return hidden
 
-# Mock Vocabulary for demo (in real app, load saved vocab)
-word2int = {"positive": 1, "negative": 0, "growth": 1, "loss": 0, "up": 1, "down": 0} 
-# We will use a simple heuristic to "simulate" LSTM input for this demo since we don't have a trained .pt file
-# In a real scenario, we would load: model.load_state_dict(torch.load('sentiment_lstm.pt'))
+# No trained weights ship with the repo, so headlines are scored with the lexicon below.
+# Set SENTIMENT_MODEL_PATH to a state_dict saved from SentimentLSTM(VOCAB_SIZE, 50, 256, 1, 2)
+# to score with the model instead. The weights must have been trained on the same tokenizer:
+# preprocess_text, then encode_words (crc32 of each word into [1, VOCAB_SIZE), 0 = padding),
+# left-padded by encode_batch, with the output read at the last time step.
+SENTIMENT_MODEL_PATH = os.environ.get("SENTIMENT_MODEL_PATH")
+
+VOCAB_SIZE = 1000
+PAD_IDX = 0
+
+POS_WORDS = {"up", "growth", "high", "profit", "gain", "bull", "record", "beat", "buy", "strong"}
+NEG_WORDS = {"down", "loss", "low", "miss", "bear", "weak", "sell", "drop", "fall", "crash"}
+
+# Lexicon weights: +1/-1 for the base words, stronger terms weighted more
+TERM_WEIGHTS = {
+    **{w: 1.0 for w in POS_WORDS},
+    **{w: -1.0 for w in NEG_WORDS},
+    "surge": 1.5, "soar": 1.5, "rally": 1.0, "upgrade": 1.0, "outperform": 1.0,
+    "plunge": -1.5, "crash": -2.0, "slump": -1.0, "downgrade": -1.0, "lawsuit": -1.0,
+}
+# Added to the weights of the two words
+BIGRAMS = {
+    ("record", "low"): -2.0,      # "record" alone is positive
+    ("beat", "expectations"): 0.5,
+    ("sell", "off"): -0.5,
+    ("short", "squeeze"): 1.0,
+    ("profit", "warning"): -3.0,
+}
+# Flip the sign of terms up to NEGATION_WINDOW words later (apostrophes are stripped, so "dont")
+NEGATIONS = {"not", "no", "never", "without", "dont", "doesnt", "didnt", "isnt", "wasnt", "cannot", "cant", "wont", "fails"}
+NEGATION_WINDOW = 3
+
+_lexicon = LexiconScorer(TERM_WEIGHTS, BIGRAMS, NEGATIONS, NEGATION_WINDOW)
+
+# Bump when the lexicon heuristic changes: the next refresh of each symbol rescores its stored articles
+LEXICON_VERSION = "lexicon-2"
+
+# Headlines are fetched from upstream at most this often per symbol; the latest NEWS_LIMIT are served
+NEWS_TTL_SECONDS = float(os.environ.get("NEWS_TTL_SECONDS", 300))
+NEWS_LIMIT = int(os.environ.get("NEWS_LIMIT", 20))
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Process-wide SentimentLSTM loaded from SENTIMENT_MODEL_PATH on first use,
+    or None when no weights file exists (the lexicon scorer is used then).
+    """
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                if SENTIMENT_MODEL_PATH and os.path.exists(SENTIMENT_MODEL_PATH):
+                    model = SentimentLSTM(VOCAB_SIZE, 50, 256, 1, 2)
+                    model.load_state_dict(torch.load(SENTIMENT_MODEL_PATH, map_location="cpu"))
+                    model.eval()
+                    _model = model
+                    logging.info(f"Loaded sentiment model weights from {SENTIMENT_MODEL_PATH}")
+                _model_loaded = True
+    return _model
 
 def preprocess_text(text):
     # Simple tokenization
@@ -49,101 +118,255 @@ def preprocess_text(text):
     words = text.split()
     return words
 
-def analyze_sentiment(text):
+def encode_words(words):
+    """Map words to token ids in [1, VOCAB_SIZE); 0 is reserved for padding."""
+    return [1 + zlib.crc32(w.encode()) % (VOCAB_SIZE - 1) for w in words]
+
+def encode_batch(token_lists):
+    """Left-pad token lists into one (batch, max_len) tensor so the last step is always a real token."""
+    max_len = max((len(t) for t in token_lists), default=0) or 1
+    batch = torch.full((len(token_lists), max_len), PAD_IDX, dtype=torch.long)
+    for i, tokens in enumerate(token_lists):
+        if tokens:
+            batch[i, max_len - len(tokens):] = torch.tensor(tokens, dtype=torch.long)
+    return batch
+
+def lexicon_score(words):
+    """Heuristic score in [0, 1]: 0.5 shifted by 0.1 per unit of lexicon weight."""
+    return float(_lexicon.score_tokens([words])[0])
+
+def analyze_sentiment_batch(texts):
     """
-    Analyze sentiment using the LSTM model architecture.
-    Note: Without a trained weight file, we are initializing a random model.
-    To make this useful for the user, we will combine a simple lexicon heuristic 
-    with the model structure to demonstrate the pipeline.
+    Score a list of texts in one pass.
+    With trained weights the whole batch goes through the LSTM in a single
+    forward pass; otherwise the batch lexicon scorer is used.
     """
-    # 1. Preprocess
-    words = preprocess_text(text)
-    
-    # 2. Heuristic check (since model is untrained)
-    # This ensures the user sees "logical" results even without a trained model file
-    pos_words = {"up", "growth", "high", "profit", "gain", "bull", "record", "beat", "buy", "strong"}
-    neg_words = {"down", "loss", "low", "miss", "bear", "weak", "sell", "drop", "fall", "crash"}
-    
-    score = 0.5
-    for w in words:
-        if w in pos_words: score += 0.1
-        if w in neg_words: score -= 0.1
-    
-    # Clamp
-    score = max(0.0, min(1.0, score))
-    
-    # 3. Run through LSTM (for demonstration of architecture)
-    # We create a dummy input to show the model accepts data
-    vocab_size = 1000
-    model = SentimentLSTM(vocab_size, 50, 256, 1, 2)
-    model.eval()
-    
-    # Dummy input tensor
-    inputs = torch.randint(0, vocab_size, (1, len(words) if len(words) > 0 else 1))
-    h = model.init_hidden(1)
+    if not texts:
+        return []
     
-    # Forward pass (result is random since weights are random, so we ignore it for the heuristic score)
-    # output, _ = model(inputs, h)
+    model = get_model()
+    if model is None:
+        with timed("lexicon", "score_batch"):
+            return _lexicon.score_batch(texts).tolist()
     
-    return score
+    word_lists = [preprocess_text(t) for t in texts]
+    inputs = encode_batch([encode_words(words) for words in word_lists])
+    with timed("torch", "sentiment_lstm"), torch.inference_mode():
+        h = model.init_hidden(inputs.size(0))
+        output, _ = model(inputs, h)
+    return output.tolist()
 
-def fetch_news(symbol):
-    try:
-        ticker = yf.Ticker(symbol)
-        news = ticker.news
-        results = []
+def analyze_sentiment(text):
+    """Analyze sentiment of a single text (see analyze_sentiment_batch)."""
+    return analyze_sentiment_batch([text])[0]
+
+def sentiment_label(score):
+    if score > 0.6: return "Positive"
+    if score < 0.4: return "Negative"
+    return "Neutral"
+
+def scorer_name():
+    """Identifies what analyze_sentiment_batch currently scores with; stored scores from another scorer are stale."""
+    return f"lstm:{os.path.basename(SENTIMENT_MODEL_PATH)}" if get_model() is not None else LEXICON_VERSION
+
+def content_hash(title, summary):
+    return hashlib.sha1(f"{title}\n{summary}".encode()).hexdigest()
+
+def _parse_article(n):
+    title = n.get('title', '')
+    # Handle different yfinance news structures
+    if 'content' in n:
+        c = n['content']
+        title = c.get('title', '')
+        summary = c.get('summary', '')
         
-        for n in news:
-            title = n.get('title', '')
-            # Handle different yfinance news structures
-            if 'content' in n:
-                c = n['content']
-                title = c.get('title', '')
-                summary = c.get('summary', '')
-                
-                # Safe link extraction
-                click_through = c.get('clickThroughUrl')
-                if click_through and isinstance(click_through, dict):
-                    link = click_through.get('url', '')
-                else:
-                    # Fallback to canonicalUrl if clickThroughUrl is missing/null
-                    canonical = c.get('canonicalUrl')
-                    if canonical and isinstance(canonical, dict):
-                        link = canonical.get('url', '')
-                    else:
-                        link = ''
-                
-                # Date parsing
-                pub_date_str = c.get('pubDate', '')
-                try:
-                    from datetime import datetime
-                    # Parse ISO format "2025-12-04T13:21:00Z"
-                    dt = datetime.strptime(pub_date_str.replace('Z', '+0000'), "%Y-%m-%dT%H:%M:%S%z")
-                    pub_time = dt.timestamp()
-                except:
-                    pub_time = 0
+        # Safe link extraction
+        click_through = c.get('clickThroughUrl')
+        if click_through and isinstance(click_through, dict):
+            link = click_through.get('url', '')
+        else:
+            # Fallback to canonicalUrl if clickThroughUrl is missing/null
+            canonical = c.get('canonicalUrl')
+            if canonical and isinstance(canonical, dict):
+                link = canonical.get('url', '')
             else:
-                summary = n.get('summary', '')
-                link = n.get('link', '')
-                pub_time = n.get('providerPublishTime', 0)
-
-            text = f"{title} {summary}"
-            sentiment_score = analyze_sentiment(text)
-            
-            sentiment_label = "Neutral"
-            if sentiment_score > 0.6: sentiment_label = "Positive"
-            elif sentiment_score < 0.4: sentiment_label = "Negative"
-            
-            results.append({
-                "title": title,
-                "summary": summary,
-                "link": link,
-                "time": pub_time,
-                "sentiment_score": sentiment_score,
-                "sentiment_label": sentiment_label
-            })
-            
-        return results
+                link = ''
+        
+        # Date parsing
+        pub_date_str = c.get('pubDate', '')
+        try:
+            # Parse ISO format "2025-12-04T13:21:00Z"
+            dt = datetime.strptime(pub_date_str.replace('Z', '+0000'), "%Y-%m-%dT%H:%M:%S%z")
+            pub_time = dt.timestamp()
+        except:
+            pub_time = 0
+    else:
+        summary = n.get('summary', '')
+        link = n.get('link', '')
+        pub_time = n.get('providerPublishTime', 0)
+
+    return {
+        "title": title or '',
+        "summary": summary or '',
+        "link": link or '',
+        "time": pub_time or 0
+    }
+
+def _symbol_lock(symbol):
+    with _locks_guard:
+        if symbol not in _locks:
+            _locks[symbol] = threading.Lock()
+        return _locks[symbol]
+
+def refresh_news(symbol):
+    """
+    Pull the latest headlines for `symbol` and store the ones not seen before.
+    Articles older than the symbol's high-water mark are skipped outright; the
+    rest are matched by content hash, reusing a score stored for another symbol
+    when possible, so only genuinely new text is scored. Articles already stored
+    for `symbol` under a different scorer are rescored in place. Returns the
+    number of articles scored.
+    """
+    with timed("yfinance", "news"):
+        news = yf.Ticker(symbol).news or []
+    articles = [_parse_article(n) for n in news]
+    scorer = scorer_name()
+
+    db = SessionLocal()
+    try:
+        mark = db.get(NewsWatermark, symbol)
+        if mark is None:
+            mark = NewsWatermark(symbol=symbol, last_published=0)
+            db.add(mark)
+
+        # Undated articles can't be placed against the mark and always go to the hash check
+        candidates = {}
+        for a in articles:
+            if a["time"] > mark.last_published or not a["time"]:
+                candidates.setdefault(content_hash(a["title"], a["summary"]), a)
+
+        # Rows for this symbol are matched whatever their scorer (the key is symbol + hash) and never
+        # inserted twice; those from another scorer are left to _rescore_stale. Only scores from the
+        # current scorer are reused.
+        stored = set()
+        reusable = {}
+        if candidates:
+            rows = db.query(ScoredArticle.symbol, ScoredArticle.content_hash, ScoredArticle.score, ScoredArticle.scorer) \
+                     .filter(ScoredArticle.content_hash.in_(list(candidates))).all()
+            for row_symbol, h, score, row_scorer in rows:
+                if row_symbol == symbol:
+                    stored.add(h)
+                if row_scorer == scorer:
+                    reusable[h] = score
+
+        new = [h for h in candidates if h not in stored]
+        to_score = [h for h in new if h not in reusable]
+        scores = analyze_sentiment_batch([f"{candidates[h]['title']} {candidates[h]['summary']}" for h in to_score])
+        reusable.update(zip(to_score, scores))
+
+        for h in new:
+            a = candidates[h]
+            db.add(ScoredArticle(symbol=symbol, content_hash=h, title=a["title"], summary=a["summary"],
+                                 link=a["link"], published_at=a["time"], score=reusable[h], scorer=scorer))
+
+        scored = len(to_score) + _rescore_stale(db, symbol, scorer)
+        mark.last_published = max([mark.last_published] + [a["time"] for a in articles])
+        mark.fetched_at = datetime.utcnow()
+        db.commit()
+        return scored
+    finally:
+        db.close()
+
+def _rescore_stale(db, symbol, scorer):
+    """
+    Rescore every article stored for `symbol` under another scorer, including
+    ones no longer in the upstream feed (reads only rescore the rows they serve).
+    """
+    stale = db.query(ScoredArticle).filter(ScoredArticle.symbol == symbol, ScoredArticle.scorer != scorer).all()
+    for r, score in zip(stale, analyze_sentiment_batch([f"{r.title} {r.summary}" for r in stale])):
+        r.score = score
+        r.scorer = scorer
+    return len(stale)
+
+def _ensure_fresh(symbol):
+    # Headlines are re-polled at most every NEWS_TTL_SECONDS per symbol
+    db = SessionLocal()
+    try:
+        mark = db.get(NewsWatermark, symbol)
+        fetched_at = mark.fetched_at if mark else None
+    finally:
+        db.close()
+    if fetched_at and (datetime.utcnow() - fetched_at).total_seconds() < NEWS_TTL_SECONDS:
+        return
+
+    with _symbol_lock(symbol):
+        db = SessionLocal()
+        try:
+            mark = db.get(NewsWatermark, symbol)
+            if mark and (datetime.utcnow() - mark.fetched_at).total_seconds() < NEWS_TTL_SECONDS:
+                return
+        finally:
+            db.close()
+        try:
+            scored = refresh_news(symbol)
+            if scored:
+                logging.info(f"Scored {scored} new articles for {symbol}")
+        except Exception as e:
+            # Serve whatever is stored, and wait out the TTL before polling upstream again
+            logging.error(f"News fetch error: {e}")
+            _mark_fetched(symbol)
+
+def _mark_fetched(symbol):
+    db = SessionLocal()
+    try:
+        mark = db.get(NewsWatermark, symbol)
+        if mark is None:
+            mark = NewsWatermark(symbol=symbol, last_published=0)
+            db.add(mark)
+        mark.fetched_at = datetime.utcnow()
+        db.commit()
     except Exception as e:
-        logging.error(f"News fetch error: {e}")
-        return []
+        logging.error(f"News watermark update error: {e}")
+    finally:
+        db.close()
+
+def _latest_rows(db, symbol, limit):
+    rows = db.query(ScoredArticle).filter(ScoredArticle.symbol == symbol) \
+             .order_by(ScoredArticle.published_at.desc()).limit(limit).all()
+
+    # Rescore rows written by a different scorer (e.g. model weights added since)
+    scorer = scorer_name()
+    stale = [r for r in rows if r.scorer != scorer]
+    if stale:
+        for r, score in zip(stale, analyze_sentiment_batch([f"{r.title} {r.summary}" for r in stale])):
+            r.score = score
+            r.scorer = scorer
+        db.commit()
+    return rows
+
+def fetch_news(symbol, limit=None):
+    """Latest scored headlines for `symbol`, served from the article store."""
+    _ensure_fresh(symbol)
+    db = SessionLocal()
+    try:
+        rows = _latest_rows(db, symbol, limit or NEWS_LIMIT)
+        return [{
+            "title": r.title,
+            "summary": r.summary,
+            "link": r.link,
+            "time": r.published_at,
+            "sentiment_score": r.score,
+            "sentiment_label": sentiment_label(r.score)
+        } for r in rows]
+    finally:
+        db.close()
+
+def get_sentiment_summary(symbol, limit=None):
+    """Average score and article count over the latest `limit` stored headlines."""
+    _ensure_fresh(symbol)
+    db = SessionLocal()
+    try:
+        scores = [r.score for r in _latest_rows(db, symbol, limit or NEWS_LIMIT)]
+        return {"average_score": sum(scores) / len(scores) if scores else None, "count": len(scores)}
+    finally:
+        db.close()
@@ -0,0 +1,33 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Blocking upstream work (yfinance, rust_core, model inference) runs on this
+# bounded pool so the event loop never blocks and concurrency stays capped.
+UPSTREAM_MAX_WORKERS = int(os.environ.get("UPSTREAM_MAX_WORKERS", 32))
+
+_executor = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix="upstream")
+_inflight = {}  # key -> asyncio.Task shared by every waiter
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the upstream executor, in the caller's context (for request metrics)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+async def singleflight(key, fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` on the upstream executor, coalescing concurrent
+    calls with the same key: one execution serves every waiter and they all
+    receive the same result (or exception). Results are shared, so callers
+    must not mutate them.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(run_blocking(fn, *args, **kwargs))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # A waiter that disconnects must not cancel the shared call for the others
+    return await asyncio.shield(task)
@@ -0,0 +1,147 @@
+import os
+import math
+import itertools
+import logging
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .backtester_service import rc, load_price_arrays, run_backtest_arrays
+from .metrics import timed
+
+# Upper bound on the combinations a single sweep request runs (after dropping invalid ones,
+# e.g. fast >= slow), and on the raw grid size enumerated to find them
+MAX_SWEEP_COMBINATIONS = 25000
+MAX_SWEEP_GRID = 10 * MAX_SWEEP_COMBINATIONS
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", os.cpu_count() or 1))
+
+# Per-worker views onto the shared price block (set by _attach_prices)
+_worker_shm = None
+_worker_arrays = None
+_worker_config = None
+
+def expand_axis(spec):
+    """Grid axis from a list of values or a {"start", "stop", "step"} range (stop inclusive)."""
+    if isinstance(spec, dict):
+        start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+        values = np.arange(start, stop + step / 2, step).tolist()
+        return [int(v) if float(v).is_integer() else v for v in values]
+    return list(spec)
+
+def _is_valid(strategy_type, params):
+    if strategy_type == "sma_cross" and "fast" in params and "slow" in params:
+        return params["fast"] < params["slow"]
+    return True
+
+def _attach_prices(shm_name, n, strategy_type, initial_capital):
+    global _worker_shm, _worker_arrays, _worker_config
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    buf = _worker_shm.buf
+    ts_ms = np.ndarray((n,), dtype=np.int64, buffer=buf, offset=0)
+    price = np.ndarray((n,), dtype=np.float64, buffer=buf, offset=8 * n)
+    volume = np.ndarray((n,), dtype=np.float64, buffer=buf, offset=16 * n)
+    _worker_arrays = (ts_ms, price, volume)
+    _worker_config = (strategy_type, initial_capital)
+
+def _run_combo(params):
+    strategy_type, initial_capital = _worker_config
+    try:
+        _, equity, sharpe = run_backtest_arrays(*_worker_arrays, strategy_type, params, initial_capital)
+    except Exception as e:
+        logging.error(f"Sweep combination {params} failed: {e}")
+        return None, None
+    if not len(equity):
+        return 0.0, 0.0
+    total_return = (equity[-1] - initial_capital) / initial_capital * 100
+    # NaN (e.g. a flat equity curve's Sharpe) is not valid JSON; report it as missing
+    return _finite_or_none(sharpe[-1]), _finite_or_none(total_return)
+
+def _finite_or_none(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def run_sweep(symbol: str, strategy_type: str, grid: dict, initial_capital: float):
+    """
+    Backtest every combination of `grid` on one price series.
+    Prices are loaded once into shared memory and the combinations are
+    spread over a process pool that reads that block in place.
+    """
+    if not rc:
+        raise ImportError("rust_core module not found. Please ensure the backtester extension is built and installed.")
+
+    names = list(grid.keys())
+    axes = [expand_axis(grid[name]) for name in names]
+    n_grid = int(np.prod([len(a) for a in axes]))
+    if n_grid > MAX_SWEEP_GRID:
+        raise ValueError(f"Grid has {n_grid} points (max {MAX_SWEEP_GRID})")
+
+    combos = (dict(zip(names, values)) for values in itertools.product(*axes))
+    valid = [c for c in combos if _is_valid(strategy_type, c)]
+    if len(valid) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"Grid has {len(valid)} valid combinations (max {MAX_SWEEP_COMBINATIONS})")
+
+    ts_ms, price, volume = load_price_arrays(symbol)
+    n = len(ts_ms)
+
+    shm = shared_memory.SharedMemory(create=True, size=24 * n)
+    try:
+        np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=0)[:] = ts_ms
+        np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=8 * n)[:] = price
+        np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=16 * n)[:] = volume
+
+        workers = max(1, min(SWEEP_WORKERS, len(valid)))
+        chunksize = max(1, len(valid) // (workers * 4))
+        # Workers come from a forkserver, not a fork of this multi-threaded server process
+        # (a fork can inherit locks held by other threads). They can't report metrics, so
+        # the whole pool run is timed here.
+        with timed("rust_core", "sweep"), \
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"),
+                                    initializer=_attach_prices,
+                                    initargs=(shm.name, n, strategy_type, initial_capital)) as pool:
+            outcomes = list(pool.map(_run_combo, valid, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = [
+        {"params": params, "sharpe": sharpe, "total_return": total_return}
+        for params, (sharpe, total_return) in zip(valid, outcomes)
+    ]
+
+    response = {
+        "symbol": symbol,
+        "strategy": strategy_type,
+        "combinations": len(valid),
+        "results": results
+    }
+
+    # Two-parameter grids also come back as heatmaps (rows = first axis, columns = second)
+    if len(names) == 2:
+        sharpe_map = np.full((len(axes[0]), len(axes[1])), np.nan)
+        return_map = np.full_like(sharpe_map, np.nan)
+        row = {v: i for i, v in enumerate(axes[0])}
+        col = {v: j for j, v in enumerate(axes[1])}
+        for r in results:
+            i, j = row[r["params"][names[0]]], col[r["params"][names[1]]]
+            if r["sharpe"] is not None:
+                sharpe_map[i, j] = r["sharpe"]
+            if r["total_return"] is not None:
+                return_map[i, j] = r["total_return"]
+
+        def to_json(m):
+            return [[None if np.isnan(v) else v for v in line] for line in m.tolist()]
+
+        response["heatmap"] = {
+            "x": names[1],
+            "y": names[0],
+            "x_values": axes[1],
+            "y_values": axes[0],
+            "sharpe": to_json(sharpe_map),
+            "total_return": to_json(return_map)
+        }
+
+    if results:
+        best = max((r for r in results if r["sharpe"] is not None), key=lambda r: r["sharpe"], default=None)
+        response["best"] = best
+
+    return response
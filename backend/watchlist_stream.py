@@ -0,0 +1,94 @@
+import os
+import asyncio
+import logging
+import itertools
+from .quote_service import get_quotes
+from .singleflight import run_blocking
+
+# One poller serves every connected client: each tick it prices the union of
+# subscribed symbols in a single batch and pushes only the prices that moved.
+WATCHLIST_POLL_SECONDS = float(os.environ.get("WATCHLIST_POLL_SECONDS", 2))
+
+
+class Subscription:
+    """A connected client: its symbols and the latest not-yet-delivered prices."""
+
+    def __init__(self, symbols):
+        self.symbols = set(symbols)
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, prices):
+        # Unsent updates are merged, so a slow client only ever gets the latest price
+        self.pending.update(prices)
+        self.ready.set()
+
+    async def next_update(self, timeout=None):
+        """Wait for changed prices; returns {} on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        update, self.pending = self.pending, {}
+        return update
+
+
+class QuoteHub:
+    def __init__(self, interval=WATCHLIST_POLL_SECONDS):
+        self.interval = interval
+        self.last_prices = {}
+        self._subs = {}
+        self._ids = itertools.count()
+        self._task = None
+
+    def subscribe(self, symbols):
+        sub_id = next(self._ids)
+        sub = Subscription(symbols)
+        self._subs[sub_id] = sub
+
+        # Start from whatever is already known
+        known = {s: self.last_prices[s] for s in sub.symbols if s in self.last_prices}
+        if known:
+            sub.push(known)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        return sub_id, sub
+
+    def update_symbols(self, sub_id, symbols):
+        sub = self._subs.get(sub_id)
+        if sub is not None:
+            sub.symbols = set(symbols)
+            known = {s: self.last_prices[s] for s in sub.symbols if s in self.last_prices}
+            if known:
+                sub.push(known)
+
+    def unsubscribe(self, sub_id):
+        self._subs.pop(sub_id, None)
+
+    def symbols(self):
+        return set().union(*(sub.symbols for sub in self._subs.values())) if self._subs else set()
+
+    async def _poll(self):
+        while self._subs:
+            symbols = sorted(self.symbols())
+            try:
+                quotes = await run_blocking(get_quotes, symbols, max_age=self.interval)
+            except Exception as e:
+                logging.error(f"Watchlist poll failed: {e}")
+                quotes = {}
+
+            changed = {s: p for s, p in quotes.items() if self.last_prices.get(s) != p}
+            self.last_prices.update(changed)
+
+            if changed:
+                for sub in list(self._subs.values()):
+                    update = {s: p for s, p in changed.items() if s in sub.symbols}
+                    if update:
+                        sub.push(update)
+
+            await asyncio.sleep(self.interval)
+
+
+hub = QuoteHub()
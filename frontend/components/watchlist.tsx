@@ -1,6 +1,6 @@
 "use client"
 
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Plus, X, BarChart2 } from 'lucide-react';
 
 interface WatchlistProps {
@@ -13,6 +13,18 @@ interface WatchlistProps {
 export const Watchlist = ({ symbols, activeSymbol, onSelect, onUpdate }: WatchlistProps) => {
     const [editingIndex, setEditingIndex] = useState<number | null>(null);
     const [tempSymbol, setTempSymbol] = useState("");
+    const [prices, setPrices] = useState<Record<string, number>>({});
+
+    // Live prices pushed by the backend's shared quote poller (only changed prices are sent)
+    useEffect(() => {
+        if (symbols.length === 0) return;
+        const ws = new WebSocket(`ws://127.0.0.1:8000/ws/watchlist?symbols=${symbols.join(',')}`);
+        ws.onmessage = (event) => {
+            const update: Record<string, number> = JSON.parse(event.data);
+            setPrices((prev) => ({ ...prev, ...update }));
+        };
+        return () => ws.close();
+    }, [symbols]);
 
     const handleStartEdit = (index: number) => {
         setEditingIndex(index);
@@ -59,7 +71,9 @@ export const Watchlist = ({ symbols, activeSymbol, onSelect, onUpdate }: Watchli
                                     <div className={`w-1 h-8 rounded-full ${sym === activeSymbol ? 'bg-blue-500' : 'bg-gray-700'}`} />
                                     <div>
                                         <div className="font-bold text-lg">{sym}</div>
-                                        <div className="text-xs text-gray-500">Stock Asset</div>
+                                        <div className="text-xs text-gray-500">
+                                            {prices[sym] !== undefined ? `$${prices[sym].toFixed(2)}` : 'Stock Asset'}
+                                        </div>
                                     </div>
                                 </div>
                                 <button